@@ -90,6 +90,37 @@ class GlueDatabaseStack(Stack):
             )
         ) 
 
+        # Create the daily rollup table computed from the intraday bars
+        daily_stock_rollup_table = glue.CfnTable(self, "DailyStockRollupTable",
+            catalog_id=self.account,
+            database_name=DATABASE_NAME,
+            table_input=glue.CfnTable.TableInputProperty(
+                description="Daily OHLCV, VWAP and Moving Averages from Intraday Stock Data",
+                name="stock_data_daily",
+                storage_descriptor=glue.CfnTable.StorageDescriptorProperty(
+                    columns=[
+                        glue.CfnTable.ColumnProperty(name="ticker", type="string"),
+                        glue.CfnTable.ColumnProperty(name="date", type="date"),
+                        glue.CfnTable.ColumnProperty(name="open", type="double"),
+                        glue.CfnTable.ColumnProperty(name="high", type="double"),
+                        glue.CfnTable.ColumnProperty(name="low", type="double"),
+                        glue.CfnTable.ColumnProperty(name="close", type="double"),
+                        glue.CfnTable.ColumnProperty(name="volume", type="double"),
+                        glue.CfnTable.ColumnProperty(name="vwap", type="double"),
+                        glue.CfnTable.ColumnProperty(name="bar_count", type="bigint"),
+                        glue.CfnTable.ColumnProperty(name="sma_5", type="double"),
+                        glue.CfnTable.ColumnProperty(name="sma_20", type="double")
+                    ],
+                    input_format="org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat",
+                    location="s3://big-data-pipeline/datalake/stock_data_daily/",
+                    output_format="org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat",
+                    serde_info=glue.CfnTable.SerdeInfoProperty(
+                        serialization_library="org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe"
+                    ),
+                )
+            )
+        )
+
         #A crawler to crawl the intraday data
         intraday_stock_data_crawler = glue.CfnCrawler(self, "IntradayStockDataCrawler",
             role=glue_role.role_name,
@@ -99,6 +130,8 @@ class GlueDatabaseStack(Stack):
             targets=glue.CfnCrawler.TargetsProperty(
                 s3_targets=[glue.CfnCrawler.S3TargetProperty(
                     path=f"s3://{BUCKET_NAME}/datalake/stock_data_intraday/",
+                    # Manifests written by datalakeManifest are not tables
+                    exclusions=["_manifest/**"],
                 )]
             ),
             schema_change_policy=glue.CfnCrawler.SchemaChangePolicyProperty(
@@ -125,5 +158,6 @@ class GlueDatabaseStack(Stack):
         # Make the tables and crawlers dependent on the database creation
         historical_stock_table.add_depends_on(glue_database)
         historical_forex_data.add_depends_on(glue_database)
+        daily_stock_rollup_table.add_depends_on(glue_database)
         intraday_stock_data_crawler.add_depends_on(glue_database)
         forex_hourly_crawler.add_depends_on(glue_database)
\ No newline at end of file
@@ -45,7 +45,11 @@ class GluePipelineStack(Stack):
         # We need to deploy the Glue Job script to s3 in order to assign it to a job
         bucket = s3.Bucket.from_bucket_name(self, "bucket", BUCKET_NAME)
         script_deployment = s3deploy.BucketDeployment(self, "DeployGlueScript",
-            sources=[s3deploy.Source.asset("./glue_pipeline/scripts/")],
+            sources=[
+                s3deploy.Source.asset("./glue_pipeline/scripts/"),
+                # The datalake manifest module is shared with the Lambda functions
+                s3deploy.Source.asset("./lambda/", exclude=["*", "!datalakeManifest.py"]),
+            ],
             destination_bucket=bucket,
             destination_key_prefix="scripts/",
             prune=False
@@ -108,6 +112,14 @@ class GluePipelineStack(Stack):
             connections=glue.CfnJob.ConnectionsListProperty(
                 connections=["JDBCConnectionToRDS"]
             ),
+            default_arguments={
+                "--extra-py-files": ",".join([
+                    "s3://big-data-pipeline/scripts/datalakeManifest.py",
+                    "s3://big-data-pipeline/scripts/outputSizing.py",
+                ]),
+                "--TARGET_FILE_MB": "128",
+                "--SORT_OUTPUT": "true",
+            },
             description="Extracts Data from RDS to S3",
             glue_version="3.0",
             worker_type="G.1X",
@@ -1,10 +1,22 @@
 import sys
+import boto3
 from awsglue.transforms import *
 from awsglue.utils import getResolvedOptions
 from pyspark.context import SparkContext
 from awsglue.context import GlueContext
 from awsglue.job import Job
 from awsglue.dynamicframe import DynamicFrame
+from pyspark.sql import functions as F
+from datalakeManifest import S3Backend, load_manifest, make_entry, snapshot_entries
+from outputSizing import size_output
+
+OUTPUT_PATH = "s3://big-data-pipeline/datalake/stock_data_historical/"
+
+# Columns whose min/max are recorded per file in the datalake manifest
+MANIFEST_COLUMNS = ["ticker", "date"]
+
+# Columns the output is range partitioned and sorted by when SORT_OUTPUT is set
+SORT_COLUMNS = ["ticker", "date"]
 
 
 #Create dynamic frame using JDBC Connection
@@ -34,10 +46,40 @@ def directJDBCSource(
     )
 
 
-args = getResolvedOptions(sys.argv, ["JOB_NAME"])
+#Collect the manifest entries of the Parquet files under a dataset path,
+#reusing the recorded entries so only new files are scanned and HEADed
+def manifestEntries(spark, path, columns, previous) -> list:
+    current_files = spark.read.parquet(path).inputFiles()
+    entries = [previous[f[len(path):]] for f in current_files if f[len(path):] in previous]
+    new_files = [f for f in current_files if f[len(path):] not in previous]
+    if not new_files:
+        return entries
+
+    aggregations = [F.count(F.lit(1)).alias("row_count")]
+    for column in columns:
+        aggregations += [F.min(column).alias(f"min_{column}"), F.max(column).alias(f"max_{column}")]
+    files = (
+        spark.read.parquet(*new_files)
+        .withColumn("file", F.input_file_name())
+        .groupBy("file")
+        .agg(*aggregations)
+        .collect()
+    )
+
+    s3 = boto3.client("s3")
+    for row in files:
+        bucket, key = row["file"].split("//")[1].split("/", 1)
+        head = s3.head_object(Bucket=bucket, Key=key)
+        stats = {column: (row[f"min_{column}"], row[f"max_{column}"]) for column in columns}
+        entries.append(make_entry(row["file"][len(path):], head["ContentLength"], row["row_count"], head["ETag"], stats))
+    return entries
+
+
+args = getResolvedOptions(sys.argv, ["JOB_NAME", "TARGET_FILE_MB", "SORT_OUTPUT"])
 sc = SparkContext()
 glueContext = GlueContext(sc)
 spark = glueContext.spark_session
+logger = glueContext.get_logger()
 job = Job(glueContext)
 job.init(args["JOB_NAME"], args)
 
@@ -53,17 +95,36 @@ PostgreSQLtable_node1 = directJDBCSource(
     transformation_ctx="PostgreSQLtable_node1",
 )
 
+# Size the output so each file is close to the target file size
+sized_df, planned_files, estimated_bytes = size_output(
+    PostgreSQLtable_node1.toDF(),
+    target_file_bytes=int(args["TARGET_FILE_MB"]) * 1024 * 1024,
+    sort_columns=SORT_COLUMNS if args["SORT_OUTPUT"].lower() == "true" else None,
+)
+logger.info(f"Writing {planned_files} files, estimated {estimated_bytes} bytes")
+SizedFrame_node2 = DynamicFrame.fromDF(sized_df, glueContext, "SizedFrame_node2")
+# The Glue 3.0 SDK has no conditional writes, this job is the only writer of its dataset
+manifest_backend = S3Backend(conditional_writes=False)
+previous_files = load_manifest(OUTPUT_PATH, manifest_backend)["files"]
+
 # Write data from RDS to S3
 S3bucket_node3 = glueContext.write_dynamic_frame.from_options(
-    frame=PostgreSQLtable_node1,
+    frame=SizedFrame_node2,
     connection_type="s3",
     format="glueparquet",
     connection_options={
-        "path": "s3://big-data-pipeline/datalake/stock_data_historical/",
+        "path": OUTPUT_PATH,
         "partitionKeys": [],
     },
     format_options={"compression": "snappy"},
     transformation_ctx="S3bucket_node3",
 )
 
+# Record every file now under the dataset path in its manifest
+entries = manifestEntries(spark, OUTPUT_PATH, MANIFEST_COLUMNS, previous_files)
+snapshot_entries(OUTPUT_PATH, entries, manifest_backend)
+
+written = [entry for entry in entries if entry["key"] not in previous_files]
+logger.info(f"Wrote {len(written)} files, {sum(entry['size'] for entry in written)} bytes to {OUTPUT_PATH}")
+
 job.commit()
@@ -0,0 +1,66 @@
+import math
+from pyspark import StorageLevel
+from pyspark.sql import types as T
+
+# Helpers used by the Glue jobs to size their Parquet output. The number of
+# output files is derived from the row count and an estimate of the encoded
+# row width, so a job writes files close to a target size instead of one file
+# per source partition.
+
+DEFAULT_TARGET_FILE_BYTES = 128 * 1024 * 1024
+
+# Approximate uncompressed width of a value of each Spark type in Parquet
+TYPE_BYTES = {
+    T.BooleanType: 1,
+    T.ByteType: 1,
+    T.ShortType: 2,
+    T.IntegerType: 4,
+    T.DateType: 4,
+    T.FloatType: 4,
+    T.LongType: 8,
+    T.DoubleType: 8,
+    T.TimestampType: 8,
+    T.DecimalType: 16,
+}
+STRING_BYTES = 16
+
+# Expected encoded/uncompressed ratio of snappy compressed Parquet
+COMPRESSION_RATIO = 0.5
+
+
+def estimate_row_bytes(schema: T.StructType) -> float:
+    """Estimate the encoded size of one row of the given schema."""
+    width = 0
+    for field in schema.fields:
+        width += TYPE_BYTES.get(type(field.dataType), STRING_BYTES)
+    return width * COMPRESSION_RATIO
+
+
+def target_file_count(row_count: int, row_bytes: float, target_file_bytes: int = DEFAULT_TARGET_FILE_BYTES) -> int:
+    """Number of files needed to write `row_count` rows close to the target size."""
+    return max(1, math.ceil(row_count * row_bytes / target_file_bytes))
+
+
+def size_output(df, target_file_bytes: int = DEFAULT_TARGET_FILE_BYTES, sort_columns: list = None):
+    """Repartition a DataFrame so each partition becomes one file near the target size.
+
+    With sort columns the rows are range partitioned and sorted within each
+    partition, so every file covers a narrow, disjoint range of those columns
+    and readers can prune on the Parquet min/max statistics. Without them the
+    partitions are coalesced, or repartitioned when more files are needed.
+
+    The input is persisted so counting its rows does not read the source twice.
+    Returns the sized DataFrame, the number of files and the estimated bytes.
+    """
+    df = df.persist(StorageLevel.MEMORY_AND_DISK)
+    row_count = df.count()
+    row_bytes = estimate_row_bytes(df.schema)
+    files = target_file_count(row_count, row_bytes, target_file_bytes)
+
+    if sort_columns:
+        df = df.repartitionByRange(files, *sort_columns).sortWithinPartitions(*sort_columns)
+    elif files < df.rdd.getNumPartitions():
+        df = df.coalesce(files)
+    elif files > df.rdd.getNumPartitions():
+        df = df.repartition(files)
+    return df, files, int(row_count * row_bytes)
@@ -3,6 +3,10 @@ from datetime import datetime
 import pandas as pd
 import pyarrow as pa
 from helperFunctions import s3_gzip_to_json, write_parquet_table_to_s3
+from s3Cache import get_cache_stats
+from parquetProfiles import WRITER_PROFILES
+from dataQuality import DEFAULT_QUARANTINE_RULES, apply_quality_gate
+from datalakeManifest import append_entries, table_entry
 
 DEST_PREFIX = "datalake/forex_historical/"
 BUCKET = os.environ["BUCKET_NAME"]
@@ -21,9 +25,19 @@ FILE_SCHEMA = pa.schema([
     ("volume", pa.float64())
 ])
 
-# Function used to parse the data in the s3 files
-def gzip_json_to_pandas(filename):
-    data = s3_gzip_to_json(filename=filename)
+# Sort order, row groups and encodings of the files written by this module
+WRITER_PROFILE = WRITER_PROFILES["forex_historical"]
+
+# Columns identifying a row, used by the data quality gate
+KEY_COLUMNS = ["from_currency", "to_currency", "date"]
+
+# FX quotes carry no traded volume, and the open or close of a day can sit
+# slightly outside its high/low, so both are counted but not rejected
+FLAG_RULES = ["zero_volume", "outside_high_low"]
+QUARANTINE_RULES = [rule for rule in DEFAULT_QUARANTINE_RULES if rule not in FLAG_RULES]
+
+# Function used to parse the nested currency/date json data
+def json_to_pandas(data):
     rows = []
     for key1, val1 in data.items():
         for key2, val2 in val1.items():
@@ -35,7 +49,11 @@ def gzip_json_to_pandas(filename):
                 }
                 row.update(val3)
                 rows.append(row)
-        return pd.DataFrame(rows)
+    return pd.DataFrame(rows)
+
+# Function used to parse the data in the s3 files
+def gzip_json_to_pandas(filename):
+    return json_to_pandas(s3_gzip_to_json(uri=filename))
 
 # File name example "s3://big-data-pipeline/data/forex_historical/202210_forex.json.gz" 
 def handler(event, context):
@@ -59,12 +77,17 @@ def handler(event, context):
         file_dest = event.get("FileDest")
     df = gzip_json_to_pandas(file_source)
     table = pa.Table.from_pandas(df, FILE_SCHEMA)
-    write_parquet_table_to_s3(table, filename=file_dest)
+    table, violations = apply_quality_gate(table, file_dest, KEY_COLUMNS, FLAG_RULES, QUARANTINE_RULES)
+    written = write_parquet_table_to_s3(table, uri=file_dest, profile=WRITER_PROFILE)
+    dataset_uri = file_dest.rsplit("/", 1)[0] + "/"
+    append_entries(dataset_uri, [table_entry(dataset_uri, file_dest, table, written, WRITER_PROFILE["sort_by"])])
     return {
         "statusCode": 200,
         "headers": {
             "Content-Type": "text/plain"
         },
-        "body": "Request Submitted"
+        "body": "Request Submitted",
+        "cacheStats": get_cache_stats(),
+        "qualityViolations": violations
     }
 
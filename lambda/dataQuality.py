@@ -0,0 +1,123 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from helperFunctions import parse_s3_uri, write_parquet_table_to_s3
+
+# This module contains the data quality gate that runs before Parquet writes.
+# Every rule is evaluated with Arrow compute kernels over whole columns and
+# returns a boolean mask of the violating rows. Rows failing a quarantine rule
+# are moved to a side prefix, rows failing a flag rule are only counted.
+
+PRICE_COLUMNS = ["open", "high", "low", "close"]
+QUARANTINE_PREFIX = "datalake/quarantine/"
+
+def _missing_price(table, keys):
+    masks = [pc.is_null(table[column], nan_is_null=True) for column in PRICE_COLUMNS]
+    mask = masks[0]
+    for other in masks[1:]:
+        mask = pc.or_(mask, other)
+    return mask
+
+def _high_below_low(table, keys):
+    return pc.less(table["high"], table["low"])
+
+def _outside_high_low(table, keys):
+    outside = [
+        pc.or_(pc.greater(table[column], table["high"]), pc.less(table[column], table["low"]))
+        for column in ("open", "close")
+    ]
+    return pc.or_(*outside)
+
+def _negative_volume(table, keys):
+    return pc.less(table["volume"], 0)
+
+def _zero_volume(table, keys):
+    return pc.equal(table["volume"], 0)
+
+def _duplicate_key(table, keys):
+    """Flag every occurrence of a key after the first one."""
+    if table.num_rows < 2:
+        return pa.chunked_array([np.zeros(table.num_rows, dtype=bool)])
+    order = pc.sort_indices(table, sort_keys=[(key, "ascending") for key in keys])
+    ordered = table.select(keys).take(order)
+    same = None
+    for key in keys:
+        column = ordered[key].combine_chunks()
+        equal = pc.fill_null(pc.equal(column[1:], column[:-1]), False)
+        same = equal if same is None else pc.and_(same, equal)
+    mask = np.zeros(table.num_rows, dtype=bool)
+    mask[order.to_numpy()[1:][same.to_numpy(zero_copy_only=False)]] = True
+    return pa.chunked_array([mask])
+
+RULES = {
+    "missing_price": _missing_price,
+    "high_below_low": _high_below_low,
+    "outside_high_low": _outside_high_low,
+    "negative_volume": _negative_volume,
+    "duplicate_key": _duplicate_key,
+    "zero_volume": _zero_volume,
+}
+
+DEFAULT_QUARANTINE_RULES = [
+    "missing_price",
+    "high_below_low",
+    "outside_high_low",
+    "negative_volume",
+    "duplicate_key",
+]
+
+def validate_table(table, keys: list, quarantine_rules: list = DEFAULT_QUARANTINE_RULES, flag_rules: list = ()):
+    """Split a table into valid and rejected rows.
+
+    Returns the valid rows, the rejected rows with a `dq_rule` column naming
+    the first quarantine rule they failed, and the violation count per rule.
+    """
+    counts = {}
+    for name in flag_rules:
+        counts[name] = pc.sum(pc.fill_null(RULES[name](table, keys), False)).as_py() or 0
+
+    masks = {}
+    rejected_mask = None
+    for name in quarantine_rules:
+        masks[name] = pc.fill_null(RULES[name](table, keys), False)
+        counts[name] = pc.sum(masks[name]).as_py() or 0
+        rejected_mask = masks[name] if rejected_mask is None else pc.or_(rejected_mask, masks[name])
+
+    # Clean tables are the common case, so only label rows when some are rejected
+    if rejected_mask is None or not pc.any(rejected_mask).as_py():
+        return table, table.append_column("dq_rule", pa.nulls(table.num_rows, pa.string())).slice(0, 0), counts
+
+    # Apply in reverse so the first failing rule is the one recorded
+    rejected = table.filter(rejected_mask)
+    reason = pa.nulls(rejected.num_rows, pa.string())
+    for name in reversed(quarantine_rules):
+        reason = pc.if_else(pc.filter(masks[name], rejected_mask), name, reason)
+
+    valid = table.filter(pc.invert(rejected_mask))
+    return valid, rejected.append_column("dq_rule", reason), counts
+
+def quarantine_uri(uri: str) -> str:
+    """Map a destination to its location under the quarantine prefix.
+
+    Destinations outside the datalake are quarantined under the same key
+    below the bucket's quarantine prefix, so rejected rows never share a
+    location with the valid ones.
+    """
+    if "/datalake/" in uri:
+        return uri.replace("/datalake/", f"/{QUARANTINE_PREFIX}", 1)
+    bucket, key = parse_s3_uri(uri)
+    return f"s3://{bucket}/{QUARANTINE_PREFIX}{key}"
+
+def apply_quality_gate(table, uri: str, keys: list, flag_rules: list = (),
+                       quarantine_rules: list = DEFAULT_QUARANTINE_RULES):
+    """Validate a table bound for `uri`, quarantine rejected rows and return the valid ones."""
+    valid, rejected, counts = validate_table(table, keys, quarantine_rules, flag_rules)
+    if rejected.num_rows:
+        write_parquet_table_to_s3(rejected, uri=quarantine_uri(uri))
+    return valid, counts
+
+def add_counts(total: dict, counts: dict) -> dict:
+    """Accumulate per-rule violation counts across several tables."""
+    for name, count in counts.items():
+        total[name] = total.get(name, 0) + count
+    return total
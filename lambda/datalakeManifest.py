@@ -0,0 +1,348 @@
+import os
+import io
+import json
+import gzip
+import time
+import random
+import uuid
+import hashlib
+import tempfile
+from datetime import date, datetime
+import boto3
+import botocore
+from botocore.exceptions import ClientError
+
+# This module maintains a manifest of the Parquet files under a dataset
+# prefix. Every writer records the key, size, row count, ETag and the min/max
+# of the partition and sort columns of the files it writes, so readers,
+# compaction and backfills can find the files for a ticker or date range
+# without listing the prefix or opening files.
+#
+# The manifest is a single gzipped JSON document stored under `_manifest/`.
+# The crawled stock_data_intraday table excludes that directory explicitly,
+# while the stock_data_historical, forex_historical and stock_data_daily
+# tables have no crawler and rely on Athena skipping paths that start with
+# an underscore.
+# Writers never update it directly. Each one stores its entries as a new
+# object under `_manifest/pending/`, which cannot conflict, and then tries
+# once to fold all pending entries into the manifest with compare-and-swap.
+# A writer that loses that race leaves its entries to the next fold, so a
+# burst of concurrent writers, such as one conversion per uploaded file,
+# never exhausts its retries. Readers apply the pending entries on top of
+# the manifest. This module only depends on boto3 so it can also be shipped
+# to the Glue jobs.
+
+MANIFEST_NAME = "_manifest/manifest.json.gz"
+PENDING_PREFIX = "_manifest/pending/"
+MAX_RETRIES = 10
+# Seconds of the first and the longest wait between conflicting updates
+BACKOFF_BASE = 0.05
+BACKOFF_CAP = 2.0
+
+class ManifestConflict(Exception):
+    """The manifest changed between reading and writing it."""
+
+class S3Backend:
+    """Stores manifests in S3 using conditional writes.
+
+    Older SDKs, such as the one bundled with Glue 3.0, do not know the
+    IfMatch/IfNoneMatch put parameters, and the backend then refuses to
+    start. A writer that is the only one of its dataset can opt out with
+    `conditional_writes=False`, which compares the ETag with a HEAD request
+    right before an unconditional put. That narrows the race without
+    closing it, so concurrent writers must never use it.
+    """
+
+    def __init__(self, client=None, conditional_writes: bool = True):
+        self.client = client or boto3.client("s3")
+        if conditional_writes:
+            members = self.client.meta.service_model.operation_model("PutObject").input_shape.members
+            if "IfMatch" not in members or "IfNoneMatch" not in members:
+                raise RuntimeError(
+                    f"botocore {botocore.__version__} does not support conditional writes, "
+                    "concurrent manifest updates would overwrite each other"
+                )
+        self.conditional_writes = conditional_writes
+
+    def read(self, uri: str):
+        bucket, key = uri.split("//")[1].split("/", 1)
+        try:
+            response = self.client.get_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return None, None
+            raise
+        return response["Body"].read(), response["ETag"]
+
+    def _etag(self, bucket: str, key: str):
+        try:
+            return self.client.head_object(Bucket=bucket, Key=key)["ETag"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return None
+            raise
+
+    def write(self, uri: str, data: bytes, token) -> None:
+        bucket, key = uri.split("//")[1].split("/", 1)
+        if not self.conditional_writes:
+            if self._etag(bucket, key) != token:
+                raise ManifestConflict(uri)
+            self.client.put_object(Bucket=bucket, Key=key, Body=data)
+            return
+
+        condition = {"IfMatch": token} if token else {"IfNoneMatch": "*"}
+        try:
+            self.client.put_object(Bucket=bucket, Key=key, Body=data, **condition)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("PreconditionFailed", "ConditionalRequestConflict"):
+                raise ManifestConflict(uri) from e
+            raise
+
+    def put(self, uri: str, data: bytes) -> None:
+        bucket, key = uri.split("//")[1].split("/", 1)
+        self.client.put_object(Bucket=bucket, Key=key, Body=data)
+
+    def list(self, prefix_uri: str) -> list:
+        bucket, prefix = prefix_uri.split("//")[1].split("/", 1)
+        uris = []
+        for page in self.client.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+            uris += [f"s3://{bucket}/{obj['Key']}" for obj in page.get("Contents", [])]
+        return sorted(uris)
+
+    def delete(self, uris: list) -> None:
+        for start in range(0, len(uris), 1000):
+            bucket = uris[start].split("//")[1].split("/", 1)[0]
+            keys = [uri.split("//")[1].split("/", 1)[1] for uri in uris[start:start + 1000]]
+            self.client.delete_objects(Bucket=bucket, Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True})
+
+class LocalBackend:
+    """Stores manifests on the local filesystem, used for tests and local runs."""
+
+    def __init__(self, lock_timeout: float = 10.0):
+        self.lock_timeout = lock_timeout
+
+    def read(self, path: str):
+        try:
+            with open(path, "rb") as manifest_file:
+                data = manifest_file.read()
+        except FileNotFoundError:
+            return None, None
+        return data, hashlib.sha256(data).hexdigest()
+
+    def write(self, path: str, data: bytes, token) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        lock_path = f"{path}.lock"
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            try:
+                lock = os.open(lock_path, os.O_CREAT | os.O_EXCL)
+                break
+            except FileExistsError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.01)
+        try:
+            if self.read(path)[1] != token:
+                raise ManifestConflict(path)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            os.close(lock)
+            os.remove(lock_path)
+
+    def put(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+
+    def list(self, prefix_path: str) -> list:
+        try:
+            names = os.listdir(prefix_path)
+        except FileNotFoundError:
+            return []
+        return sorted(os.path.join(prefix_path, name) for name in names if not name.endswith(".tmp"))
+
+    def delete(self, paths: list) -> None:
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+def get_backend(dataset_uri: str):
+    """Pick the backend matching the dataset location."""
+    return S3Backend() if dataset_uri.startswith("s3://") else LocalBackend()
+
+def manifest_uri(dataset_uri: str) -> str:
+    return f"{dataset_uri.rstrip('/')}/{MANIFEST_NAME}"
+
+def pending_uri(dataset_uri: str) -> str:
+    return f"{dataset_uri.rstrip('/')}/{PENDING_PREFIX}"
+
+def _encode_value(value):
+    """Make statistics JSON serialisable while keeping them comparable."""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def partition_stats(key: str) -> dict:
+    """Statistics of the hive style `name=value` partitions in a file key."""
+    stats = {}
+    for segment in key.split("/")[:-1]:
+        if "=" in segment:
+            name, value = segment.split("=", 1)
+            stats[name] = [value, value]
+    return stats
+
+def table_stats(table, columns: list) -> dict:
+    """Min/max of the given columns of a PyArrow Table."""
+    # Imported here so the Glue jobs can use this module without pyarrow
+    import pyarrow.compute as pc
+    stats = {}
+    for column in columns:
+        min_max = pc.min_max(table[column]).as_py()
+        if min_max["min"] is not None:
+            stats[column] = [_encode_value(min_max["min"]), _encode_value(min_max["max"])]
+    return stats
+
+def make_entry(key: str, size: int, row_count: int, etag: str, stats: dict) -> dict:
+    """Build the manifest entry of one file, `key` is relative to the dataset prefix."""
+    return {
+        "key": key,
+        "size": size,
+        "row_count": row_count,
+        "etag": etag,
+        "stats": {
+            column: [_encode_value(low), _encode_value(high)]
+            for column, (low, high) in stats.items()
+            if low is not None
+        },
+    }
+
+def table_entry(dataset_uri: str, file_uri: str, table, written: dict, columns: list) -> dict:
+    """Build the manifest entry of a table written to `file_uri` by write_parquet_table_to_s3."""
+    key = file_uri[len(dataset_uri):]
+    stats = {**partition_stats(key), **table_stats(table, columns)}
+    return make_entry(key, written["size"], table.num_rows, written["etag"], stats)
+
+def _decode(data) -> dict:
+    if data is None:
+        return {"version": 0, "files": {}, "folded": []}
+    with gzip.GzipFile(fileobj=io.BytesIO(data)) as gzip_file:
+        manifest = json.load(gzip_file)
+    # Manifests written before the pending log have no folded names
+    manifest.setdefault("folded", [])
+    return manifest
+
+def _encode(manifest) -> bytes:
+    return gzip.compress(json.dumps(manifest, separators=(",", ":")).encode("utf-8"))
+
+def _apply_pending(manifest: dict, backend, pending: list) -> dict:
+    """Apply the pending entries that are not folded into the manifest yet, oldest first."""
+    folded = set(manifest["folded"])
+    for uri in pending:
+        if uri.rsplit("/", 1)[-1] in folded:
+            continue
+        data = backend.read(uri)[0]
+        # Only deleted after being folded into a newer manifest
+        if data is None:
+            continue
+        for entry in _decode_entries(data):
+            manifest["files"][entry["key"]] = entry
+    return manifest
+
+def _decode_entries(data: bytes) -> list:
+    with gzip.GzipFile(fileobj=io.BytesIO(data)) as gzip_file:
+        return json.load(gzip_file)
+
+def load_manifest(dataset_uri: str, backend=None) -> dict:
+    """Read the manifest of a dataset with its pending entries, an empty manifest if none exists."""
+    backend = backend or get_backend(dataset_uri)
+    # Listed before reading the manifest, so an entry folded in between is in the manifest
+    pending = backend.list(pending_uri(dataset_uri))
+    manifest = _decode(backend.read(manifest_uri(dataset_uri))[0])
+    return _apply_pending(manifest, backend, pending)
+
+def is_recorded(manifest: dict, dataset_uri: str, file_uri: str, etag: str) -> bool:
+    """Whether the manifest has an up to date entry for the file."""
+    entry = manifest["files"].get(file_uri[len(dataset_uri):])
+    return entry is not None and entry["etag"] == etag
+
+def _update(dataset_uri: str, apply, backend, attempts: int = MAX_RETRIES) -> dict:
+    """Apply a change to the manifest and fold the pending entries into it.
+
+    The pending objects folded into the new manifest are deleted afterwards.
+    Their names stay in the manifest until a later fold no longer lists them,
+    so they are never applied twice.
+    """
+    uri = manifest_uri(dataset_uri)
+    for attempt in range(attempts):
+        data, token = backend.read(uri)
+        # A pending object deleted after this read belongs to a newer manifest,
+        # so the write below fails and the fold is retried
+        pending = backend.list(pending_uri(dataset_uri))
+        manifest = apply(_apply_pending(_decode(data), backend, pending))
+        manifest["folded"] = [pending_file.rsplit("/", 1)[-1] for pending_file in pending]
+        manifest["version"] += 1
+        try:
+            backend.write(uri, _encode(manifest), token)
+        except ManifestConflict:
+            if attempt + 1 < attempts:
+                # Full jitter spreads out writers that lost the same race
+                time.sleep(random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)))
+            continue
+        backend.delete(pending)
+        return manifest
+    raise ManifestConflict(uri)
+
+def fold_pending(dataset_uri: str, backend=None, attempts: int = MAX_RETRIES) -> dict:
+    """Fold the pending entries of a dataset into its manifest."""
+    return _update(dataset_uri, lambda manifest: manifest, backend or get_backend(dataset_uri), attempts)
+
+def append_entries(dataset_uri: str, entries: list, backend=None) -> dict:
+    """Add or replace the entries of the given files, keeping all others.
+
+    The entries are stored as a pending object first, so they are recorded
+    even if another writer wins the single attempt to fold them.
+    """
+    backend = backend or get_backend(dataset_uri)
+    # Names sort by creation time, so later entries for a file win
+    name = f"{time.time_ns():020d}-{uuid.uuid4().hex}.json.gz"
+    backend.put(f"{pending_uri(dataset_uri)}{name}", _encode(entries))
+    try:
+        return fold_pending(dataset_uri, backend, attempts=1)
+    except ManifestConflict:
+        return load_manifest(dataset_uri, backend)
+
+def snapshot_entries(dataset_uri: str, entries: list, backend=None) -> dict:
+    """Replace the manifest with exactly the given entries, discarding pending ones."""
+    def apply(manifest):
+        manifest["files"] = {entry["key"]: entry for entry in entries}
+        return manifest
+    return _update(dataset_uri, apply, backend or get_backend(dataset_uri))
+
+def query_files(dataset_uri: str, ranges: dict, backend=None) -> list:
+    """Return the entries of the files that may contain rows within all `ranges`.
+
+    `ranges` maps a column to an inclusive (low, high) tuple, either bound may be
+    None. Files without statistics for a column are always kept.
+    """
+    files = load_manifest(dataset_uri, backend)["files"].values()
+    matches = []
+    for entry in files:
+        keep = True
+        for column, (low, high) in ranges.items():
+            if column not in entry["stats"]:
+                continue
+            file_min, file_max = entry["stats"][column]
+            if (low is not None and file_max < _encode_value(low)) or \
+               (high is not None and file_min > _encode_value(high)):
+                keep = False
+                break
+        if keep:
+            matches.append(entry)
+    return sorted(matches, key=lambda entry: entry["key"])
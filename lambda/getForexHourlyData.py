@@ -3,6 +3,10 @@ from datetime import datetime
 import pandas as pd
 import pyarrow as pa
 from helperFunctions import s3_gzip_to_json, write_parquet_table_to_s3
+from s3Cache import get_cache_stats
+from parquetProfiles import WRITER_PROFILES
+from dataQuality import DEFAULT_QUARANTINE_RULES, apply_quality_gate
+from datalakeManifest import append_entries, table_entry
 
 BUCKET = os.environ["BUCKET_NAME"]
 DEST_PREFIX = "datalake/forex_historical/"
@@ -20,9 +24,20 @@ FILE_SCHEMA = pa.schema([
     ("volume", pa.float64())
 ])
 
+# Sort order, row groups and encodings of the files written by this module
+WRITER_PROFILE = WRITER_PROFILES["forex_historical"]
+
+# Columns identifying a row, used by the data quality gate
+KEY_COLUMNS = ["from_currency", "to_currency", "date"]
+
+# FX quotes carry no traded volume, and the open or close of a day can sit
+# slightly outside its high/low, so both are counted but not rejected
+FLAG_RULES = ["zero_volume", "outside_high_low"]
+QUARANTINE_RULES = [rule for rule in DEFAULT_QUARANTINE_RULES if rule not in FLAG_RULES]
+
 def convert_gzip_json_to_dataframe(file_path: str) -> pd.DataFrame:
     """Convert gzipped JSON data from S3 to a DataFrame."""
-    data = s3_gzip_to_json(filename=file_path)
+    data = s3_gzip_to_json(uri=file_path)
     rows = [
         {
             "from_currency": currency_pair.split("_")[0],
@@ -57,10 +72,14 @@ def process_file(event: dict):
 
     df = convert_gzip_json_to_dataframe(file_source)
     table = pa.Table.from_pandas(df, schema=FILE_SCHEMA)
-    write_parquet_table_to_s3(table, filename=file_dest)
+    table, violations = apply_quality_gate(table, file_dest, KEY_COLUMNS, FLAG_RULES, QUARANTINE_RULES)
+    written = write_parquet_table_to_s3(table, uri=file_dest, profile=WRITER_PROFILE)
+    dataset_uri = file_dest.rsplit("/", 1)[0] + "/"
+    append_entries(dataset_uri, [table_entry(dataset_uri, file_dest, table, written, WRITER_PROFILE["sort_by"])])
     return {
         "statusCode": 200,
-        "body": "Data successfully processed and saved."
+        "body": "Data successfully processed and saved.",
+        "qualityViolations": violations
     }
 
 def lambda_handler(event, context):
@@ -71,5 +90,7 @@ def lambda_handler(event, context):
         "headers": {
             "Content-Type": "text/plain"
         },
-        "body": response.get("body", "An unexpected error occurred.")
+        "body": response.get("body", "An unexpected error occurred."),
+        "cacheStats": get_cache_stats(),
+        "qualityViolations": response.get("qualityViolations", {})
     }
@@ -1,9 +1,17 @@
 import os
-from alpha_vantage.timeseries import TimeSeries
 import pandas as pd
 from datetime import datetime, timedelta, date
 import pyarrow as pa
-from helperFunctions import write_parquet_table_to_s3
+from helperFunctions import (
+    head_s3_file,
+    merge_tables_on_keys,
+    read_parquet_table_from_s3,
+    write_parquet_table_to_s3,
+)
+from parquetProfiles import WRITER_PROFILES
+from dataQuality import add_counts, apply_quality_gate
+from rollupIntradayData import update_daily_rollup
+from datalakeManifest import append_entries, is_recorded, load_manifest, table_entry
 
 API_KEY = os.environ["API_KEY"]
 LOCATION = "s3://big-data-pipeline/datalake/stock_data_intraday/"
@@ -39,8 +47,19 @@ FILE_SCHEMA = pa.schema([
     ("volume", pa.float64())
 ])
 
+# Sort order, row groups and encodings of the files written by this module
+WRITER_PROFILE = WRITER_PROFILES["stock_data_intraday"]
+
+# Columns identifying a bar, used to merge reruns into existing partitions
+MERGE_KEYS = ["ticker", "datetime"]
+
+# Rules that are counted by the data quality gate without rejecting rows
+FLAG_RULES = ["zero_volume"]
+
 def get_stock_data(ticker: str) -> pd.DataFrame:
     """Fetches intraday stock data from Alpha Vantage API."""
+    # Imported here so the partition writers can be used without the API client
+    from alpha_vantage.timeseries import TimeSeries
     ts = TimeSeries(key=API_KEY, output_format="pandas")
     data, _ = ts.get_intraday(symbol=ticker, interval="15min", outputsize="full")
     data.reset_index(inplace=True)
@@ -48,22 +67,58 @@ def get_stock_data(ticker: str) -> pd.DataFrame:
     data.rename(columns=COLUMN_MAPPER, inplace=True)
     return data[COLUMN_ORDER]
 
-def write_daily_data(df: pd.DataFrame, specific_dates: list) -> None:
-    """Writes daily stock data to S3 in Parquet format."""
+def write_daily_data(df: pd.DataFrame, specific_dates: list) -> dict:
+    """Merges daily stock data into the S3 Parquet partitions.
+
+    Bars already stored for a day are kept unless the new data contains
+    the same (ticker, datetime), in which case the new bar wins. Partitions
+    whose contents would not change, and days without any bars that have
+    no partition yet, are not written. The bars of every stored partition,
+    written or unchanged, are returned so the daily rollup is brought up to
+    date even when a previous run failed after writing the partitions.
+    Unchanged partitions missing from the manifest, or recorded with an
+    outdated ETag, are added to it for the same reason.
+    """
     ticker = df["ticker"].unique()[0]
     dates_to_process = specific_dates or df["datetime"].dt.date.unique()
+    report = {"written": [], "skipped": [], "violations": {}, "tables": []}
+    entries = []
+    manifest = None
 
     for single_date in dates_to_process:
         date_str = single_date.strftime("%Y-%m-%d")
         file_location = f"{LOCATION}date={date_str}/{ticker}.parquet"
         day_data = df[df["datetime"].dt.date == single_date]
-        table = pa.Table.from_pandas(day_data, schema=FILE_SCHEMA)
-        write_parquet_table_to_s3(table, uri=file_location)
+        table = pa.Table.from_pandas(day_data, schema=FILE_SCHEMA, preserve_index=False)
+        table, violations = apply_quality_gate(table, file_location, MERGE_KEYS, FLAG_RULES)
+        add_counts(report["violations"], violations)
+        existing = read_parquet_table_from_s3(file_location)
+        merged = merge_tables_on_keys(existing, table, MERGE_KEYS)
+        if existing is None and merged.num_rows == 0:
+            # No trading on this day (weekend or holiday), nothing to store
+            report["skipped"].append(date_str)
+            continue
+        report["tables"].append(merged)
+        if existing is not None and merged.equals(existing.select(FILE_SCHEMA.names).cast(FILE_SCHEMA)):
+            report["skipped"].append(date_str)
+            stored = head_s3_file(file_location)
+            if manifest is None:
+                manifest = load_manifest(LOCATION)
+            if not is_recorded(manifest, LOCATION, file_location, stored["etag"]):
+                entries.append(table_entry(LOCATION, file_location, merged, stored, WRITER_PROFILE["sort_by"]))
+            continue
+        written = write_parquet_table_to_s3(merged, uri=file_location, profile=WRITER_PROFILE)
+        report["written"].append(date_str)
+        entries.append(table_entry(LOCATION, file_location, merged, written, WRITER_PROFILE["sort_by"]))
+
+    if entries:
+        append_entries(LOCATION, entries)
+    return report
 
 def lambda_handler(event, context):
     """Handles Lambda event for processing stock data."""
     try:
-        dates = [datetime.strptime(d, "%Y-%m-%d") for d in event.get("dates", [])]
+        dates = [datetime.strptime(d, "%Y-%m-%d").date() for d in event.get("dates", [])]
     except ValueError:
         return {
             "statusCode": 400,
@@ -84,10 +139,15 @@ def lambda_handler(event, context):
         dates = dates or [date.today() - timedelta(days=1)]
 
     data = get_stock_data(ticker)
-    write_daily_data(data, dates)
+    report = write_daily_data(data, dates)
+    rollup_days = update_daily_rollup(ticker, pa.concat_tables(report["tables"])) if report["tables"] else []
 
     return {
         "statusCode": 200,
         "headers": {"Content-Type": "text/plain"},
-        "body": "Request Completed"
+        "body": "Request Completed",
+        "partitionsWritten": report["written"],
+        "partitionsSkipped": report["skipped"],
+        "qualityViolations": report["violations"],
+        "rollupDaysUpdated": rollup_days
     }
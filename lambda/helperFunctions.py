@@ -2,7 +2,14 @@ import boto3
 import json
 import io
 import gzip
+import mmap
+from contextlib import contextmanager
+from botocore.exceptions import ClientError
+import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.parquet as pq
+from s3Cache import cache_enabled, open_cached
+from parquetProfiles import DEFAULT_PROFILE, prepare_table, write_options
 
 # This module contains functions to facilitate
 # reading from and writing to S3.
@@ -23,32 +30,104 @@ def get_s3_object(bucket: str, key: str):
     s3 = get_s3_resource()
     return s3.Object(bucket, key)
 
-def read_s3_file(uri: str):
-    """Read data from an S3 file."""
+@contextmanager
+def open_s3_file(uri: str):
+    """Open an S3 file as a binary file-like object.
+
+    When S3_CACHE_DIR is set the object is served from the local
+    read-through cache instead of being downloaded on every call.
+    """
     bucket, key = parse_s3_uri(uri)
     s3_obj = get_s3_object(bucket, key)
     try:
-        return s3_obj.get()["Body"].read()
+        if cache_enabled():
+            with open_cached(s3_obj, bucket, key) as cached_file:
+                yield cached_file
+        else:
+            with io.BytesIO(s3_obj.get()["Body"].read()) as buffer:
+                yield buffer
     except boto3.exceptions.Boto3Error as e:
         raise RuntimeError(f"Failed to read from {uri}") from e
 
-def write_to_s3(data, uri: str) -> None:
-    """Write data to an S3 file."""
+def read_s3_file(uri: str):
+    """Read data from an S3 file."""
+    with open_s3_file(uri) as s3_file:
+        return s3_file.read()
+
+def write_to_s3(data, uri: str) -> dict:
+    """Write data to an S3 file and return the put response."""
     bucket, key = parse_s3_uri(uri)
     s3_obj = get_s3_object(bucket, key)
     try:
-        s3_obj.put(Body=data)
+        return s3_obj.put(Body=data)
     except boto3.exceptions.Boto3Error as e:
         raise RuntimeError(f"Failed to write to {uri}") from e
 
+def head_s3_file(uri: str) -> dict:
+    """Return the size and ETag of an S3 file without downloading it."""
+    bucket, key = parse_s3_uri(uri)
+    s3_obj = get_s3_object(bucket, key)
+    return {"size": s3_obj.content_length, "etag": s3_obj.e_tag}
+
 def s3_gzip_to_json(uri: str):
     """Read a gzipped JSON file from S3 and return its contents."""
-    compressed_data = read_s3_file(uri)
-    with gzip.GzipFile(fileobj=io.BytesIO(compressed_data)) as gzip_file:
-        return json.load(gzip_file)
+    with open_s3_file(uri) as s3_file:
+        with gzip.GzipFile(fileobj=s3_file) as gzip_file:
+            return json.load(gzip_file)
 
-def write_parquet_table_to_s3(table, uri: str):
-    """Write a PyArrow Table to S3 as a Parquet file."""
+def encode_parquet_table(table, profile: dict = DEFAULT_PROFILE) -> bytes:
+    """Encode a PyArrow Table as Parquet using a writer profile."""
+    table = prepare_table(table, profile)
     with io.BytesIO() as buffer:
-        pq.write_table(table, buffer, compression="snappy")
-        write_to_s3(buffer.getvalue(), uri)
+        pq.write_table(table, buffer, **write_options(table, profile))
+        return buffer.getvalue()
+
+def write_parquet_table_to_s3(table, uri: str, profile: dict = DEFAULT_PROFILE) -> dict:
+    """Write a PyArrow Table to S3 as a Parquet file and return its size and ETag."""
+    data = encode_parquet_table(table, profile)
+    response = write_to_s3(data, uri)
+    return {"size": len(data), "etag": response["ETag"]}
+
+def _read_parquet_file(s3_file):
+    """Decode an open S3 file, reading a cached copy straight from its memory map."""
+    data = s3_file if isinstance(s3_file, mmap.mmap) else s3_file.read()
+    return pq.read_table(pa.BufferReader(pa.py_buffer(data)))
+
+def read_parquet_table_from_s3(uri: str):
+    """Read a Parquet file from S3 into a PyArrow Table, or None if it does not exist."""
+    try:
+        with open_s3_file(uri) as s3_file:
+            # Decoded in its own frame so no view of the memory map outlives the file
+            return _read_parquet_file(s3_file)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return None
+        raise
+
+def merge_tables_on_keys(existing, new, keys: list):
+    """Merge two tables on the key columns, preferring rows from the new table.
+
+    Both tables are concatenated with a source marker and sorted once on the
+    keys, so duplicates end up adjacent and are removed with a vectorized
+    comparison of each row against its successor. The result is sorted by keys.
+    """
+    if existing is None:
+        existing = new.schema.empty_table()
+    existing = existing.select(new.schema.names).cast(new.schema)
+    combined = pa.concat_tables([
+        existing.append_column("_source", pa.repeat(pa.scalar(0, pa.int8()), existing.num_rows)),
+        new.append_column("_source", pa.repeat(pa.scalar(1, pa.int8()), new.num_rows)),
+    ])
+    if combined.num_rows == 0:
+        return new
+    sort_keys = [(key, "ascending") for key in keys] + [("_source", "ascending")]
+    combined = combined.take(pc.sort_indices(combined, sort_keys=sort_keys))
+
+    # Keep the last row of each run of equal keys, i.e. the newest one
+    is_last = None
+    for key in keys:
+        column = combined[key].combine_chunks()
+        differs = pc.fill_null(pc.not_equal(column[:-1], column[1:]), True)
+        is_last = differs if is_last is None else pc.or_(is_last, differs)
+    is_last = pa.concat_arrays([is_last, pa.array([True])])
+    return combined.filter(is_last).select(new.schema.names)
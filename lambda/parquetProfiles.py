@@ -0,0 +1,78 @@
+import pyarrow.parquet as pq
+
+# This module contains the Parquet writer profiles used by the datalake
+# writers. The module that owns a FILE_SCHEMA picks the profile for its
+# dataset, so sort order, row-group sizing, codec and encodings stay
+# consistent for every file written to the same prefix.
+
+DEFAULT_PROFILE = {
+    # Columns the rows are sorted by before writing, tightens min/max statistics
+    "sort_by": [],
+    # Uncompressed bytes per row group, None keeps the pyarrow default
+    "row_group_bytes": None,
+    "compression": "snappy",
+    "compression_level": None,
+    # True, False or the list of columns to dictionary encode
+    "use_dictionary": True,
+    "write_statistics": True,
+    # Writes the column and offset indexes used for page level pruning
+    "write_page_index": False,
+}
+
+def make_profile(**overrides) -> dict:
+    """Return a writer profile based on the default one."""
+    unknown = set(overrides) - set(DEFAULT_PROFILE)
+    if unknown:
+        raise ValueError(f"Unknown writer profile settings: {sorted(unknown)}")
+    return {**DEFAULT_PROFILE, **overrides}
+
+WRITER_PROFILES = {
+    "default": DEFAULT_PROFILE,
+    "forex_historical": make_profile(
+        sort_by=["from_currency", "to_currency", "date"],
+        row_group_bytes=64 * 1024 * 1024,
+        compression="zstd",
+        compression_level=3,
+        use_dictionary=["from_currency", "to_currency"],
+        write_page_index=True,
+    ),
+    "stock_data_intraday": make_profile(
+        sort_by=["ticker", "datetime"],
+        row_group_bytes=64 * 1024 * 1024,
+        compression="zstd",
+        compression_level=3,
+        use_dictionary=["ticker"],
+        write_page_index=True,
+    ),
+    "stock_data_daily": make_profile(
+        sort_by=["ticker", "date"],
+        compression="zstd",
+        compression_level=3,
+        use_dictionary=["ticker"],
+    ),
+}
+
+def prepare_table(table, profile: dict):
+    """Sort a table according to the profile."""
+    if profile["sort_by"] and table.num_rows > 1:
+        table = table.sort_by([(column, "ascending") for column in profile["sort_by"]])
+    return table
+
+def write_options(table, profile: dict) -> dict:
+    """Translate a profile into keyword arguments for pyarrow.parquet.write_table."""
+    options = {
+        "compression": profile["compression"],
+        "compression_level": profile["compression_level"],
+        "use_dictionary": profile["use_dictionary"],
+        "write_statistics": profile["write_statistics"],
+    }
+    if profile["row_group_bytes"] and table.num_rows:
+        row_bytes = max(1, table.nbytes // table.num_rows)
+        options["row_group_size"] = max(1, profile["row_group_bytes"] // row_bytes)
+    if profile["write_page_index"]:
+        options["write_page_index"] = True
+    if profile["sort_by"]:
+        options["sorting_columns"] = pq.SortingColumn.from_ordering(
+            table.schema, [(column, "ascending") for column in profile["sort_by"]]
+        )
+    return options
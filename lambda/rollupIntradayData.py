@@ -0,0 +1,173 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from datetime import datetime
+from helperFunctions import (
+    head_s3_file,
+    merge_tables_on_keys,
+    read_parquet_table_from_s3,
+    write_parquet_table_to_s3,
+)
+from parquetProfiles import WRITER_PROFILES
+from datalakeManifest import append_entries, is_recorded, load_manifest, table_entry
+
+INTRADAY_LOCATION = "s3://big-data-pipeline/datalake/stock_data_intraday/"
+ROLLUP_LOCATION = "s3://big-data-pipeline/datalake/stock_data_daily/"
+
+# Trading day windows of the simple moving averages of the daily close
+MOVING_AVERAGE_WINDOWS = [5, 20]
+
+DAILY_SCHEMA = pa.schema([
+    ("ticker", pa.string()),
+    ("date", pa.date32()),
+    ("open", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("volume", pa.float64()),
+    ("vwap", pa.float64()),
+    ("bar_count", pa.int64())
+])
+
+# Schema for the Parquet file, also registered in the GlueDatabaseStack
+FILE_SCHEMA = pa.schema(
+    list(DAILY_SCHEMA) + [(f"sma_{window}", pa.float64()) for window in MOVING_AVERAGE_WINDOWS]
+)
+
+WRITER_PROFILE = WRITER_PROFILES["stock_data_daily"]
+
+ROLLUP_KEYS = ["ticker", "date"]
+
+INTRADAY_COLUMNS = ["datetime", "ticker", "open", "high", "low", "close", "volume"]
+
+def _group_starts(*codes) -> np.ndarray:
+    """Positions where any of the (sorted) code arrays changes value."""
+    n = len(codes[0])
+    boundary = np.zeros(n, dtype=bool)
+    boundary[:1] = True
+    for values in codes:
+        boundary[1:] |= values[1:] != values[:-1]
+    return np.flatnonzero(boundary)
+
+def compute_daily_bars(bars: pa.Table) -> pa.Table:
+    """Aggregate 15-minute bars into one OHLCV row per ticker and day.
+
+    VWAP uses the typical price (high + low + close) / 3 weighted by volume.
+    """
+    if bars.num_rows == 0:
+        return DAILY_SCHEMA.empty_table()
+    bars = bars.sort_by([("ticker", "ascending"), ("datetime", "ascending")])
+    tickers = pc.dictionary_encode(bars["ticker"]).combine_chunks()
+    days = pc.cast(bars["datetime"], pa.date32())
+    starts = _group_starts(
+        tickers.indices.to_numpy(),
+        days.combine_chunks().cast(pa.int32()).to_numpy(),
+    )
+    ends = np.append(starts[1:], bars.num_rows) - 1
+
+    high = bars["high"].to_numpy()
+    low = bars["low"].to_numpy()
+    close = bars["close"].to_numpy()
+    volume = bars["volume"].to_numpy()
+    daily_volume = np.add.reduceat(volume, starts)
+    price_volume = np.add.reduceat((high + low + close) / 3 * volume, starts)
+    vwap = np.divide(price_volume, daily_volume, out=np.full(len(starts), np.nan), where=daily_volume > 0)
+
+    return pa.table({
+        "ticker": pc.take(bars["ticker"], starts),
+        "date": pc.take(days, starts),
+        "open": bars["open"].to_numpy()[starts],
+        "high": np.maximum.reduceat(high, starts),
+        "low": np.minimum.reduceat(low, starts),
+        "close": close[ends],
+        "volume": daily_volume,
+        "vwap": pa.array(vwap, from_pandas=True),
+        "bar_count": np.diff(np.append(starts, bars.num_rows)),
+    }, schema=DAILY_SCHEMA)
+
+def add_moving_averages(daily: pa.Table, windows: list = MOVING_AVERAGE_WINDOWS) -> pa.Table:
+    """Append trailing simple moving averages of the close, per ticker.
+
+    The table must be sorted by ticker and date. Days with fewer than
+    `window` prior trading days of history, or a missing close within the
+    window, get a null average.
+    """
+    daily = daily.select(DAILY_SCHEMA.names)
+    close = daily["close"].to_numpy()
+    positions = np.arange(daily.num_rows)
+    if daily.num_rows:
+        starts = _group_starts(pc.dictionary_encode(daily["ticker"]).combine_chunks().indices.to_numpy())
+        group_start = np.repeat(starts, np.diff(np.append(starts, daily.num_rows)))
+    else:
+        group_start = positions
+    # Separate running counts of missing closes keep a NaN from poisoning
+    # every later window sum
+    missing = np.isnan(close)
+    cumulative = np.concatenate([[0.0], np.cumsum(np.where(missing, 0.0, close))])
+    cumulative_missing = np.concatenate([[0], np.cumsum(missing)])
+
+    for window in windows:
+        full = positions - group_start >= window - 1
+        average = np.full(daily.num_rows, np.nan)
+        ends = positions[full] + 1
+        sums = cumulative[ends] - cumulative[ends - window]
+        gaps = cumulative_missing[ends] - cumulative_missing[ends - window]
+        average[full] = np.where(gaps == 0, sums / window, np.nan)
+        daily = daily.append_column(f"sma_{window}", pa.array(average, from_pandas=True))
+    return daily
+
+def update_daily_rollup(ticker: str, bars: pa.Table) -> list:
+    """Recompute the days covered by `bars` and merge them into the ticker's rollup.
+
+    Returns the dates that were updated, or an empty list if the stored
+    rollup already matched and nothing was written. An unchanged rollup is
+    still added to the manifest if its entry is missing or outdated.
+    """
+    new_days = compute_daily_bars(bars)
+    if new_days.num_rows == 0:
+        return []
+    file_location = f"{ROLLUP_LOCATION}{ticker}.parquet"
+    existing = read_parquet_table_from_s3(file_location)
+    merged = merge_tables_on_keys(existing, new_days, ROLLUP_KEYS)
+    rollup = add_moving_averages(merged)
+    if existing is not None and rollup.equals(existing.select(FILE_SCHEMA.names).cast(FILE_SCHEMA)):
+        stored = head_s3_file(file_location)
+        if not is_recorded(load_manifest(ROLLUP_LOCATION), ROLLUP_LOCATION, file_location, stored["etag"]):
+            append_entries(ROLLUP_LOCATION, [table_entry(ROLLUP_LOCATION, file_location, rollup, stored, WRITER_PROFILE["sort_by"])])
+        return []
+    written = write_parquet_table_to_s3(rollup, uri=file_location, profile=WRITER_PROFILE)
+    append_entries(ROLLUP_LOCATION, [table_entry(ROLLUP_LOCATION, file_location, rollup, written, WRITER_PROFILE["sort_by"])])
+    return [day.strftime("%Y-%m-%d") for day in new_days["date"].to_pylist()]
+
+def lambda_handler(event, context):
+    """Rebuilds the daily rollup of a ticker from its stored intraday partitions."""
+    ticker = event.get("ticker")
+    if not ticker:
+        return {
+            "statusCode": 400,
+            "headers": {"Content-Type": "text/plain"},
+            "body": "Request Failed! No ticker included in request"
+        }
+    try:
+        dates = [datetime.strptime(d, "%Y-%m-%d").date() for d in event.get("dates", [])]
+    except ValueError:
+        return {
+            "statusCode": 400,
+            "headers": {"Content-Type": "text/plain"},
+            "body": "Invalid Dates! Dates must be in format 'YYYY-MM-DD'"
+        }
+
+    tables = []
+    for single_date in dates:
+        date_str = single_date.strftime("%Y-%m-%d")
+        table = read_parquet_table_from_s3(f"{INTRADAY_LOCATION}date={date_str}/{ticker}.parquet")
+        if table is not None:
+            tables.append(table.select(INTRADAY_COLUMNS))
+    updated = update_daily_rollup(ticker, pa.concat_tables(tables)) if tables else []
+
+    return {
+        "statusCode": 200,
+        "headers": {"Content-Type": "text/plain"},
+        "body": "Request Completed",
+        "rollupDaysUpdated": updated
+    }
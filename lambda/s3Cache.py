@@ -0,0 +1,139 @@
+import os
+import mmap
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from botocore.exceptions import ClientError
+
+# This module implements an optional read-through disk cache for S3 objects.
+# Cached copies are keyed by bucket/key/ETag and revalidated with a
+# conditional GET, so warm Lambda containers and local backfill runs only
+# download an object again when it has changed.
+
+CACHE_DIR = os.environ.get("S3_CACHE_DIR", "")
+CACHE_MAX_BYTES = int(os.environ.get("S3_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+CACHE_STATS = {
+    "hits": 0,
+    "misses": 0,
+    "evictions": 0,
+    "bytes_served": 0,
+    "bytes_downloaded": 0,
+}
+
+def cache_enabled() -> bool:
+    """Return True if a cache directory has been configured."""
+    return bool(CACHE_DIR)
+
+def get_cache_stats() -> dict:
+    """Return a copy of the cache counters including the hit rate."""
+    stats = dict(CACHE_STATS)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return stats
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+def _pointer_path(bucket: str, key: str) -> str:
+    """Path of the file holding the ETag of the cached copy of an object."""
+    return os.path.join(CACHE_DIR, f"{_digest(f'{bucket}/{key}')}.etag")
+
+def _data_path(bucket: str, key: str, etag: str) -> str:
+    """Path of the cached copy of a specific version of an object."""
+    return os.path.join(CACHE_DIR, f"{_digest(f'{bucket}/{key}')}-{_digest(etag)}.bin")
+
+def _atomic_write(path: str, data: bytes) -> None:
+    """Write to a temporary file and rename it so readers never see partial data."""
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _read_pointer(bucket: str, key: str) -> str:
+    try:
+        with open(_pointer_path(bucket, key), "r") as pointer:
+            return pointer.read()
+    except FileNotFoundError:
+        return ""
+
+def _is_not_modified(error: ClientError) -> bool:
+    code = error.response.get("Error", {}).get("Code")
+    status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return code in ("304", "NotModified") or status == 304
+
+def _evict(keep: str) -> None:
+    """Delete least recently used cache entries until the size limit is met."""
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith(".bin"):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= CACHE_MAX_BYTES:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        CACHE_STATS["evictions"] += 1
+
+def _fetch(s3_obj, bucket: str, key: str) -> str:
+    """Return the path of an up to date cached copy of the object."""
+    etag = _read_pointer(bucket, key)
+    cached_path = _data_path(bucket, key, etag) if etag else ""
+    request = {"IfNoneMatch": etag} if cached_path and os.path.exists(cached_path) else {}
+
+    try:
+        response = s3_obj.get(**request)
+    except ClientError as e:
+        if not (request and _is_not_modified(e)):
+            raise
+        try:
+            # Touch the entry so eviction treats it as recently used
+            os.utime(cached_path)
+            CACHE_STATS["hits"] += 1
+            return cached_path
+        except FileNotFoundError:
+            # Evicted by a concurrent invocation since the existence check
+            response = s3_obj.get()
+
+    CACHE_STATS["misses"] += 1
+    data = response["Body"].read()
+    CACHE_STATS["bytes_downloaded"] += len(data)
+    path = _data_path(bucket, key, response["ETag"])
+    _atomic_write(path, data)
+    _atomic_write(_pointer_path(bucket, key), response["ETag"].encode("utf-8"))
+    _evict(keep=path)
+    return path
+
+@contextmanager
+def open_cached(s3_obj, bucket: str, key: str):
+    """Yield a memory-mapped, read-only view of the cached object."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    try:
+        cached_file = open(_fetch(s3_obj, bucket, key), "rb")
+    except FileNotFoundError:
+        cached_file = open(_fetch(s3_obj, bucket, key), "rb")
+    with cached_file:
+        if os.fstat(cached_file.fileno()).st_size == 0:
+            yield cached_file
+            return
+        with mmap.mmap(cached_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            CACHE_STATS["bytes_served"] += len(mapped)
+            yield mapped
@@ -18,7 +18,16 @@ class LambdaPipelineStack(Stack):
         # Environment settings
         bucket_name = config("BUCKET_NAME")
         api_key = config("API_KEY")
-        environment = {"API_KEY": api_key, "BUCKET_NAME": bucket_name}
+        environment = {
+            "API_KEY": api_key,
+            "BUCKET_NAME": bucket_name,
+        }
+        # Read-through cache for the S3 source objects of the converters, reused by warm containers
+        converter_environment = {
+            **environment,
+            "S3_CACHE_DIR": "/tmp/s3cache",
+            "S3_CACHE_MAX_BYTES": str(256 * 1024 * 1024),
+        }
         
         # Define IAM role for Lambda functions
         lambda_role = self.create_lambda_role()
@@ -32,7 +41,7 @@ class LambdaPipelineStack(Stack):
             "ConvertHistoricalDataHandler",
             "convertHistoricalData.handler",
             [pandas_layer],
-            environment,
+            converter_environment,
             lambda_role
         )
         intraday_data_handler = self.create_lambda_function(
@@ -42,11 +51,18 @@ class LambdaPipelineStack(Stack):
             environment,
             lambda_role
         )
+        rollup_data_handler = self.create_lambda_function(
+            "RollupDataHandler",
+            "rollupIntradayData.lambda_handler",
+            [pandas_layer],
+            environment,
+            lambda_role
+        )
         forex_data_handler = self.create_lambda_function(
             "ForexDataHandler",
             "getForexHourlyData.handler",
             [alpha_vantage_layer],
-            environment,
+            converter_environment,
             lambda_role
         )
 
@@ -0,0 +1,109 @@
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from glob import glob
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Writes the sample datasets under each Parquet writer profile and reports
+# file size, encode time and the bytes a scan has to read after pruning
+# row groups on min/max statistics, without touching S3.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambda"))
+os.environ.setdefault("BUCKET_NAME", "benchmark")
+
+from convertHistoricalData import FILE_SCHEMA as FOREX_SCHEMA, json_to_pandas
+from helperFunctions import encode_parquet_table
+from parquetProfiles import WRITER_PROFILES
+
+DATA_GLOB = os.path.join(os.path.dirname(__file__), "..", "data", "forex_historical", "*.json.gz")
+
+# Smaller row groups than production so pruning is visible on the sample data
+SMALL_ROW_GROUP_BYTES = 1024 * 1024
+
+def forex_sample() -> pa.Table:
+    tables = []
+    for filename in sorted(glob(DATA_GLOB)):
+        with gzip.open(filename) as gzip_file:
+            tables.append(pa.Table.from_pandas(json_to_pandas(json.load(gzip_file)), FOREX_SCHEMA))
+    return pa.concat_tables(tables)
+
+def intraday_sample(tickers: int = 20, days: int = 60, seed: int = 7) -> pa.Table:
+    """Synthetic 15-minute bars in the order the API returns them (newest first per ticker)."""
+    rng = np.random.default_rng(seed)
+    bars_per_day = 26
+    start = datetime(2022, 8, 1, 9, 30)
+    times = [start + timedelta(days=d, minutes=15 * b) for d in range(days) for b in range(bars_per_day)][::-1]
+    columns = {name: [] for name in ("datetime", "ticker", "open", "high", "low", "close", "volume")}
+    for index in range(tickers):
+        close = 100 + np.cumsum(rng.normal(0, 0.5, len(times)))
+        spread = rng.uniform(0.01, 0.5, len(times))
+        columns["datetime"].extend(times)
+        columns["ticker"].extend([f"T{index:02d}"] * len(times))
+        columns["open"].extend(close + rng.uniform(-spread, spread))
+        columns["high"].extend(close + spread)
+        columns["low"].extend(close - spread)
+        columns["close"].extend(close)
+        columns["volume"].extend(rng.integers(100, 100000, len(times)).astype(float))
+    return pa.table(columns).cast(pa.schema([
+        ("datetime", pa.timestamp("s")),
+        ("ticker", pa.string()),
+        ("open", pa.float64()),
+        ("high", pa.float64()),
+        ("low", pa.float64()),
+        ("close", pa.float64()),
+        ("volume", pa.float64()),
+    ]))
+
+def pruned_scan_bytes(data: bytes, predicate: dict) -> int:
+    """Compressed bytes of the row groups whose statistics may match the equality predicate."""
+    metadata = pq.ParquetFile(pa.BufferReader(data)).metadata
+    names = metadata.schema.names
+    scanned = 0
+    for index in range(metadata.num_row_groups):
+        row_group = metadata.row_group(index)
+        matches = True
+        for column, value in predicate.items():
+            stats = row_group.column(names.index(column)).statistics
+            if stats is not None and stats.has_min_max and not stats.min <= value <= stats.max:
+                matches = False
+        if matches:
+            scanned += sum(row_group.column(c).total_compressed_size for c in range(row_group.num_columns))
+    return scanned
+
+def benchmark(name: str, table: pa.Table, predicate: dict, repeat: int = 3) -> list:
+    results = []
+    for profile_name, profile in WRITER_PROFILES.items():
+        columns = set(profile["sort_by"])
+        if isinstance(profile["use_dictionary"], list):
+            columns.update(profile["use_dictionary"])
+        if not columns <= set(table.schema.names):
+            continue
+        variants = [(profile_name, profile)]
+        if profile["row_group_bytes"]:
+            variants.append((f"{profile_name}+small_row_groups", {**profile, "row_group_bytes": SMALL_ROW_GROUP_BYTES}))
+        for variant_name, variant in variants:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                data = encode_parquet_table(table, variant)
+            encode_seconds = (time.perf_counter() - start) / repeat
+            results.append({
+                "dataset": name,
+                "profile": variant_name,
+                "rows": table.num_rows,
+                "row_groups": pq.ParquetFile(pa.BufferReader(data)).metadata.num_row_groups,
+                "file_bytes": len(data),
+                "encode_seconds": round(encode_seconds, 4),
+                "pruned_scan_bytes": pruned_scan_bytes(data, predicate),
+            })
+    return results
+
+if __name__ == "__main__":
+    results = benchmark("forex_historical", forex_sample(), {"from_currency": "JPY"})
+    results += benchmark("stock_data_intraday", intraday_sample(), {"ticker": "T07"})
+    for result in results:
+        print(result)
@@ -0,0 +1,44 @@
+import gzip
+import json
+import os
+import sys
+import time
+from glob import glob
+
+import pyarrow as pa
+
+# Measures the overhead of the data quality gate relative to converting the
+# historical forex sample files, without touching S3.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambda"))
+os.environ.setdefault("BUCKET_NAME", "benchmark")
+
+from convertHistoricalData import FILE_SCHEMA, FLAG_RULES, KEY_COLUMNS, json_to_pandas
+from dataQuality import validate_table
+
+DATA_GLOB = os.path.join(os.path.dirname(__file__), "..", "data", "forex_historical", "*.json.gz")
+
+def benchmark(files: list, repeat: int = 3) -> dict:
+    convert_seconds = validate_seconds = 0.0
+    rows = 0
+    for _ in range(repeat):
+        for filename in files:
+            start = time.perf_counter()
+            with gzip.open(filename) as gzip_file:
+                data = json.load(gzip_file)
+            table = pa.Table.from_pandas(json_to_pandas(data), FILE_SCHEMA)
+            convert_seconds += time.perf_counter() - start
+
+            start = time.perf_counter()
+            validate_table(table, KEY_COLUMNS, flag_rules=FLAG_RULES)
+            validate_seconds += time.perf_counter() - start
+            rows += table.num_rows
+    return {
+        "files": len(files),
+        "rows": rows // repeat,
+        "convert_seconds": round(convert_seconds / repeat, 4),
+        "validate_seconds": round(validate_seconds / repeat, 4),
+        "overhead_pct": round(100 * validate_seconds / convert_seconds, 2),
+    }
+
+if __name__ == "__main__":
+    print(benchmark(sorted(glob(DATA_GLOB))))
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The Lambda handlers import each other as top level modules,
+# mirroring how they are packaged in the Lambda runtime.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "lambda"))
+
+# Helper modules shipped to the Glue jobs with --extra-py-files
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "glue_pipeline", "scripts"))
@@ -0,0 +1,90 @@
+import gzip
+import json
+import math
+import os
+from datetime import datetime
+
+import pyarrow as pa
+
+os.environ.setdefault("BUCKET_NAME", "test")
+import convertHistoricalData
+from dataQuality import quarantine_uri, validate_table
+
+SCHEMA = pa.schema([
+    ("datetime", pa.timestamp("s")),
+    ("ticker", pa.string()),
+    ("open", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("volume", pa.float64()),
+])
+KEYS = ["ticker", "datetime"]
+
+
+def bar(minute, open_=1.0, high=2.0, low=0.5, close=1.5, volume=100.0):
+    return {"datetime": datetime(2022, 10, 3, 10, minute), "ticker": "IBM",
+            "open": open_, "high": high, "low": low, "close": close, "volume": volume}
+
+
+def test_rules_quarantine_bad_rows():
+    table = pa.Table.from_pylist([
+        bar(0),
+        bar(15, close=math.nan),
+        bar(30, high=0.4),
+        bar(45, close=3.0),
+        bar(0),
+        bar(50, volume=-1.0),
+        bar(55, volume=0.0),
+    ], schema=SCHEMA)
+
+    valid, rejected, counts = validate_table(table, KEYS, flag_rules=["zero_volume"])
+
+    assert valid["datetime"].to_pylist() == [datetime(2022, 10, 3, 10, 0), datetime(2022, 10, 3, 10, 55)]
+    assert rejected["dq_rule"].to_pylist() == [
+        "missing_price", "high_below_low", "outside_high_low", "duplicate_key", "negative_volume"
+    ]
+    assert counts == {
+        "zero_volume": 1,
+        "missing_price": 1,
+        "high_below_low": 1,
+        # high < low also puts open and close outside the range
+        "outside_high_low": 2,
+        "negative_volume": 1,
+        "duplicate_key": 1,
+    }
+
+
+def test_clean_table_passes_unchanged():
+    table = pa.Table.from_pylist([bar(0), bar(15)], schema=SCHEMA)
+    valid, rejected, counts = validate_table(table, KEYS)
+    assert valid.equals(table)
+    assert rejected.num_rows == 0
+    assert not any(counts.values())
+
+
+def test_forex_sample_month_is_not_rejected():
+    sample = os.path.join(os.path.dirname(__file__), "..", "..", "data", "forex_historical", "201112_forex.json.gz")
+    with gzip.open(sample) as gzip_file:
+        df = convertHistoricalData.json_to_pandas(json.load(gzip_file))
+    table = pa.Table.from_pandas(df, convertHistoricalData.FILE_SCHEMA)
+
+    valid, rejected, counts = validate_table(
+        table, convertHistoricalData.KEY_COLUMNS,
+        convertHistoricalData.QUARANTINE_RULES, convertHistoricalData.FLAG_RULES,
+    )
+
+    assert rejected.num_rows == 0
+    assert valid.num_rows == table.num_rows
+    # Closes slightly outside the day's range are real quotes, only counted
+    assert counts["outside_high_low"] > 0
+
+
+def test_quarantine_uri():
+    assert quarantine_uri("s3://bucket/datalake/forex_historical/201001_forex.parquet") == \
+        "s3://bucket/datalake/quarantine/forex_historical/201001_forex.parquet"
+
+
+def test_quarantine_uri_outside_datalake():
+    assert quarantine_uri("s3://bucket/exports/201001_forex.parquet") == \
+        "s3://bucket/datalake/quarantine/exports/201001_forex.parquet"
@@ -0,0 +1,278 @@
+import gzip
+import io
+import json
+from datetime import date, datetime
+import time
+from threading import Thread
+from types import SimpleNamespace
+
+import boto3
+import pyarrow as pa
+import pytest
+from botocore.response import StreamingBody
+from botocore.stub import ANY, Stubber
+
+import datalakeManifest
+from datalakeManifest import (
+    LocalBackend,
+    S3Backend,
+    append_entries,
+    load_manifest,
+    make_entry,
+    query_files,
+    snapshot_entries,
+    table_entry,
+)
+
+
+def intraday_entry(dataset, day, ticker, first_bar, last_bar):
+    table = pa.table({
+        "ticker": [ticker, ticker],
+        "datetime": pa.array([first_bar, last_bar], pa.timestamp("s")),
+    })
+    file_uri = f"{dataset}date={day}/{ticker}.parquet"
+    return table_entry(dataset, file_uri, table, {"size": 100, "etag": f'"{day}{ticker}"'}, ["ticker", "datetime"])
+
+
+def test_append_and_query_without_listing(tmp_path):
+    dataset = f"{tmp_path}/stock_data_intraday/"
+    append_entries(dataset, [
+        intraday_entry(dataset, "2022-10-03", "IBM", datetime(2022, 10, 3, 9, 30), datetime(2022, 10, 3, 16)),
+        intraday_entry(dataset, "2022-10-03", "MSFT", datetime(2022, 10, 3, 9, 30), datetime(2022, 10, 3, 16)),
+    ])
+    append_entries(dataset, [
+        intraday_entry(dataset, "2022-10-04", "IBM", datetime(2022, 10, 4, 9, 30), datetime(2022, 10, 4, 16)),
+    ])
+
+    manifest = load_manifest(dataset)
+    assert manifest["version"] == 2
+    assert manifest["files"]["date=2022-10-04/IBM.parquet"]["stats"] == {
+        "date": ["2022-10-04", "2022-10-04"],
+        "ticker": ["IBM", "IBM"],
+        "datetime": ["2022-10-04T09:30:00", "2022-10-04T16:00:00"],
+    }
+
+    keys = [entry["key"] for entry in query_files(dataset, {"ticker": ("IBM", "IBM")})]
+    assert keys == ["date=2022-10-03/IBM.parquet", "date=2022-10-04/IBM.parquet"]
+    keys = [entry["key"] for entry in query_files(dataset, {
+        "ticker": ("IBM", "IBM"),
+        "datetime": (datetime(2022, 10, 4), None),
+    })]
+    assert keys == ["date=2022-10-04/IBM.parquet"]
+    assert query_files(dataset, {"date": (date(2022, 10, 5), date(2022, 10, 9))}) == []
+
+
+def test_append_replaces_rewritten_file(tmp_path):
+    dataset = f"{tmp_path}/stock_data_daily/"
+    append_entries(dataset, [make_entry("IBM.parquet", 10, 1, '"a"', {"date": (date(2022, 9, 1), date(2022, 9, 1))})])
+    append_entries(dataset, [make_entry("IBM.parquet", 20, 2, '"b"', {"date": (date(2022, 9, 1), date(2022, 9, 2))})])
+
+    (entry,) = load_manifest(dataset)["files"].values()
+    assert (entry["size"], entry["row_count"], entry["etag"]) == (20, 2, '"b"')
+    assert entry["stats"]["date"] == ["2022-09-01", "2022-09-02"]
+
+
+def test_snapshot_replaces_all_entries(tmp_path):
+    dataset = f"{tmp_path}/stock_data_historical/"
+    append_entries(dataset, [make_entry("part-0.parquet", 1, 1, '"a"', {})])
+    snapshot_entries(dataset, [make_entry("part-1.parquet", 1, 1, '"b"', {})])
+    assert list(load_manifest(dataset)["files"]) == ["part-1.parquet"]
+
+
+def test_stale_write_is_rejected_and_retried(tmp_path):
+    dataset = f"{tmp_path}/forex_historical/"
+    backend = LocalBackend()
+    path = datalakeManifest.manifest_uri(dataset)
+    append_entries(dataset, [make_entry("201001_forex.parquet", 1, 1, '"a"', {})], backend)
+    _, token = backend.read(path)
+    append_entries(dataset, [make_entry("201002_forex.parquet", 1, 1, '"b"', {})], backend)
+
+    with pytest.raises(datalakeManifest.ManifestConflict):
+        backend.write(path, b"stale", token)
+
+    threads = [
+        Thread(target=append_entries, args=(dataset, [make_entry(f"2011{m:02d}_forex.parquet", 1, 1, '"c"', {})], backend))
+        for m in range(1, 9)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(load_manifest(dataset)["files"]) == 10
+
+
+
+def test_conflicting_updates_back_off(tmp_path, monkeypatch):
+    class ConflictingBackend(LocalBackend):
+        def write(self, path, data, token):
+            raise datalakeManifest.ManifestConflict(path)
+
+    waits = []
+    monkeypatch.setattr(datalakeManifest.time, "sleep", waits.append)
+    with pytest.raises(datalakeManifest.ManifestConflict):
+        snapshot_entries(f"{tmp_path}/stock_data_historical/", [make_entry("a.parquet", 1, 1, '"a"', {})], ConflictingBackend())
+
+    # No wait after the last attempt
+    assert len(waits) == datalakeManifest.MAX_RETRIES - 1
+    for attempt, wait in enumerate(waits):
+        assert 0 <= wait <= min(datalakeManifest.BACKOFF_CAP, datalakeManifest.BACKOFF_BASE * 2 ** attempt)
+
+
+class SlowBackend(LocalBackend):
+    """LocalBackend with the latency of S3 requests, so concurrent writers overlap."""
+
+    def __init__(self, latency):
+        super().__init__(lock_timeout=60.0)
+        self.latency = latency
+
+    def read(self, path):
+        time.sleep(self.latency)
+        return super().read(path)
+
+    def write(self, path, data, token):
+        time.sleep(self.latency)
+        return super().write(path, data, token)
+
+    def put(self, path, data):
+        time.sleep(self.latency)
+        return super().put(path, data)
+
+    def list(self, prefix_path):
+        time.sleep(self.latency)
+        return super().list(prefix_path)
+
+
+def test_burst_of_writers_records_every_file(tmp_path):
+    # One conversion per forex file uploaded by the data deployment
+    dataset = f"{tmp_path}/forex_historical/"
+    backend = SlowBackend(latency=0.03)
+    errors = []
+
+    def convert(month):
+        try:
+            append_entries(dataset, [make_entry(f"{month:03d}_forex.parquet", 1, 1, '"a"', {})], backend)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [Thread(target=convert, args=(month,)) for month in range(154)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(load_manifest(dataset, backend)["files"]) == 154
+    manifest = datalakeManifest.fold_pending(dataset, backend)
+    assert len(manifest["files"]) == 154
+    assert backend.list(datalakeManifest.pending_uri(dataset)) == []
+
+
+def test_pending_entries_are_applied_in_order(tmp_path):
+    dataset = f"{tmp_path}/stock_data_intraday/"
+    backend = LocalBackend()
+
+    class LosingBackend(LocalBackend):
+        def write(self, path, data, token):
+            raise datalakeManifest.ManifestConflict(path)
+
+    # Both folds are lost, the entries stay pending and the newer one wins
+    append_entries(dataset, [make_entry("date=2022-10-03/IBM.parquet", 1, 1, '"a"', {})], LosingBackend())
+    append_entries(dataset, [make_entry("date=2022-10-03/IBM.parquet", 2, 2, '"b"', {})], LosingBackend())
+    assert load_manifest(dataset, backend)["files"]["date=2022-10-03/IBM.parquet"]["etag"] == '"b"'
+
+    manifest = datalakeManifest.fold_pending(dataset, backend)
+    assert manifest["files"]["date=2022-10-03/IBM.parquet"]["etag"] == '"b"'
+    assert backend.list(datalakeManifest.pending_uri(dataset)) == []
+
+DATASET = "s3://bucket/datalake/stock_data_daily/"
+MANIFEST_KEY = "datalake/stock_data_daily/_manifest/manifest.json.gz"
+PENDING_PREFIX = "datalake/stock_data_daily/_manifest/pending/"
+PENDING_KEY = f"{PENDING_PREFIX}00000000000000000001-a.json.gz"
+
+
+def s3_client():
+    return boto3.client("s3", region_name="us-east-1",
+                        aws_access_key_id="test", aws_secret_access_key="test")
+
+
+def manifest_body(files, folded=()):
+    data = gzip.compress(json.dumps({"version": 1, "files": files, "folded": list(folded)}).encode())
+    return {"Body": StreamingBody(io.BytesIO(data), len(data)), "ETag": '"v1"'}
+
+
+def pending_body(entries):
+    data = gzip.compress(json.dumps(entries).encode())
+    return {"Body": StreamingBody(io.BytesIO(data), len(data)), "ETag": '"p1"'}
+
+
+def stub_pending_write(stub, entry):
+    """The pending object put by append_entries and the listing of the fold that follows."""
+    stub.add_response("put_object", {"ETag": '"p1"'}, {"Bucket": "bucket", "Key": ANY, "Body": ANY})
+    stub.add_client_error("get_object", service_error_code="NoSuchKey", http_status_code=404,
+                          expected_params={"Bucket": "bucket", "Key": MANIFEST_KEY})
+    stub.add_response("list_objects_v2", {"Contents": [{"Key": PENDING_KEY}], "IsTruncated": False},
+                      {"Bucket": "bucket", "Prefix": PENDING_PREFIX})
+    stub.add_response("get_object", pending_body([entry]), {"Bucket": "bucket", "Key": PENDING_KEY})
+
+
+def stub_delete_pending(stub):
+    stub.add_response("delete_objects", {}, {
+        "Bucket": "bucket",
+        "Delete": {"Objects": [{"Key": PENDING_KEY}], "Quiet": True},
+    })
+
+
+def test_s3_backend_uses_conditional_writes(monkeypatch):
+    monkeypatch.setattr(datalakeManifest.time, "sleep", lambda seconds: None)
+    client = s3_client()
+    entry = make_entry("IBM.parquet", 1, 1, '"a"', {})
+    with Stubber(client) as stub:
+        # First fold creates the manifest only if it does not exist yet
+        stub_pending_write(stub, entry)
+        stub.add_response("put_object", {"ETag": '"v1"'},
+                          {"Bucket": "bucket", "Key": MANIFEST_KEY, "Body": ANY, "IfNoneMatch": "*"})
+        stub_delete_pending(stub)
+        manifest = append_entries(DATASET, [entry], S3Backend(client))
+
+        # A concurrent update makes the first attempt fail, the retry succeeds
+        for error in (True, False):
+            stub.add_response("get_object", manifest_body({"IBM.parquet": entry}), {"Bucket": "bucket", "Key": MANIFEST_KEY})
+            stub.add_response("list_objects_v2", {"IsTruncated": False}, {"Bucket": "bucket", "Prefix": PENDING_PREFIX})
+            expected = {"Bucket": "bucket", "Key": MANIFEST_KEY, "Body": ANY, "IfMatch": '"v1"'}
+            if error:
+                stub.add_client_error("put_object", service_error_code="PreconditionFailed", http_status_code=412,
+                                      expected_params=expected)
+            else:
+                stub.add_response("put_object", {"ETag": '"v2"'}, expected)
+        datalakeManifest.fold_pending(DATASET, S3Backend(client))
+        stub.assert_no_pending_responses()
+
+
+def test_s3_backend_falls_back_without_conditional_writes():
+    client = s3_client()
+    backend = S3Backend(client, conditional_writes=False)
+    entry = make_entry("IBM.parquet", 1, 1, '"a"', {})
+    with Stubber(client) as stub:
+        stub_pending_write(stub, entry)
+        stub.add_client_error("head_object", service_error_code="404", http_status_code=404,
+                              expected_params={"Bucket": "bucket", "Key": MANIFEST_KEY})
+        stub.add_response("put_object", {"ETag": '"v1"'},
+                          {"Bucket": "bucket", "Key": MANIFEST_KEY, "Body": ANY})
+        stub_delete_pending(stub)
+        append_entries(DATASET, [entry], backend)
+
+        # The manifest changed since it was read, so the put is not attempted
+        stub.add_response("head_object", {"ETag": '"v3"'}, {"Bucket": "bucket", "Key": MANIFEST_KEY})
+        with pytest.raises(datalakeManifest.ManifestConflict):
+            backend.write(f"{DATASET}_manifest/manifest.json.gz", b"data", '"v2"')
+        stub.assert_no_pending_responses()
+
+
+def test_s3_backend_requires_conditional_writes(monkeypatch):
+    client = s3_client()
+    # Simulate an SDK that predates conditional writes
+    old_put = SimpleNamespace(input_shape=SimpleNamespace(members={"Bucket": None, "Key": None, "Body": None}))
+    monkeypatch.setattr(client.meta.service_model, "operation_model", lambda name: old_put)
+    with pytest.raises(RuntimeError):
+        S3Backend(client)
+    assert not S3Backend(client, conditional_writes=False).conditional_writes
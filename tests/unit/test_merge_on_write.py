@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import pyarrow as pa
+
+from helperFunctions import merge_tables_on_keys
+
+SCHEMA = pa.schema([
+    ("datetime", pa.timestamp("s")),
+    ("ticker", pa.string()),
+    ("close", pa.float64()),
+])
+KEYS = ["ticker", "datetime"]
+
+
+def bars(rows):
+    return pa.Table.from_pylist(
+        [{"datetime": datetime(2022, 10, 3, h, m), "ticker": t, "close": c} for t, h, m, c in rows],
+        schema=SCHEMA,
+    )
+
+
+def test_new_bars_replace_and_extend_existing():
+    existing = bars([("IBM", 9, 30, 1.0), ("IBM", 9, 45, 2.0)])
+    new = bars([("IBM", 10, 0, 3.5), ("IBM", 9, 45, 2.5)])
+
+    merged = merge_tables_on_keys(existing, new, KEYS)
+
+    assert merged.to_pylist() == bars([
+        ("IBM", 9, 30, 1.0), ("IBM", 9, 45, 2.5), ("IBM", 10, 0, 3.5)
+    ]).to_pylist()
+
+
+def test_rerun_with_same_bars_is_unchanged():
+    existing = bars([("IBM", 9, 30, 1.0), ("IBM", 9, 45, 2.0)])
+    merged = merge_tables_on_keys(existing, bars([("IBM", 9, 45, 2.0)]), KEYS)
+    assert merged.equals(existing)
+
+
+def test_duplicates_within_new_data_are_collapsed():
+    new = bars([("IBM", 9, 30, 1.0), ("IBM", 9, 30, 1.0), ("MSFT", 9, 30, 4.0)])
+    merged = merge_tables_on_keys(None, new, KEYS)
+    assert merged.num_rows == 2
+    assert merged["ticker"].to_pylist() == ["IBM", "MSFT"]
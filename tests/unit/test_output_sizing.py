@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip("pyspark")
+from pyspark.sql import SparkSession
+from pyspark.sql import types as T
+
+from outputSizing import estimate_row_bytes, size_output, target_file_count
+
+SCHEMA = T.StructType([
+    T.StructField("ticker", T.StringType()),
+    T.StructField("date", T.DateType()),
+    T.StructField("open", T.DoubleType()),
+    T.StructField("high", T.DoubleType()),
+    T.StructField("low", T.DoubleType()),
+    T.StructField("close", T.DoubleType()),
+    T.StructField("adj_close", T.DoubleType()),
+    T.StructField("volume", T.DoubleType()),
+])
+
+
+@pytest.fixture(scope="module")
+def spark():
+    try:
+        session = SparkSession.builder.master("local[2]").appName("output-sizing").getOrCreate()
+    except Exception as e:
+        pytest.skip(f"Local Spark is not available: {e}")
+    yield session
+    session.stop()
+
+
+def test_file_count_follows_estimated_size():
+    row_bytes = estimate_row_bytes(SCHEMA)
+    assert row_bytes == (16 + 4 + 6 * 8) * 0.5
+    assert target_file_count(0, row_bytes) == 1
+    assert target_file_count(1000, row_bytes, target_file_bytes=34 * 1000) == 1
+    assert target_file_count(1001, row_bytes, target_file_bytes=34 * 1000) == 2
+
+
+def test_output_is_range_partitioned_and_sorted(tmp_path, spark):
+    tickers = ["AMZN", "IBM", "MSFT", "GOOG"]
+    rows = [
+        (ticker, date(2010, 1, 1) + timedelta(days=day), 1.0, 2.0, 0.5, 1.5, 1.5, 100.0)
+        for day in range(500) for ticker in tickers
+    ]
+    # Many small source partitions, as produced by a parallel JDBC read
+    df = spark.createDataFrame(rows, SCHEMA).repartition(16)
+
+    sized, files, estimated_bytes = size_output(df, target_file_bytes=20 * 1024, sort_columns=["ticker", "date"])
+    assert estimated_bytes == int(len(rows) * estimate_row_bytes(SCHEMA))
+    assert files == 4
+    sized.write.parquet(str(tmp_path / "out"))
+
+    written = sorted((tmp_path / "out").glob("part-*.parquet"))
+    assert 1 < len(written) <= files
+    ranges = []
+    for path in written:
+        part = spark.read.parquet(str(path)).collect()
+        keys = [(row["ticker"], row["date"]) for row in part]
+        assert keys == sorted(keys)
+        ranges.append((keys[0], keys[-1]))
+    # Each file covers a disjoint key range, so min/max statistics prune well
+    ranges.sort()
+    assert all(previous[1] < current[0] for previous, current in zip(ranges, ranges[1:]))
+
+
+def test_coalesce_without_sort_columns(spark):
+    df = spark.createDataFrame([("IBM", date(2010, 1, 1)) + (1.0,) * 6], SCHEMA).repartition(8)
+    sized, files, _ = size_output(df)
+    assert files == 1
+    assert sized.rdd.getNumPartitions() == 1
@@ -0,0 +1,30 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from helperFunctions import encode_parquet_table
+from parquetProfiles import WRITER_PROFILES, make_profile
+
+
+def test_profile_sorts_and_encodes_table():
+    table = pa.table({
+        "ticker": ["MSFT", "IBM", "MSFT", "IBM"],
+        "datetime": pa.array([2, 2, 1, 1], pa.timestamp("s")),
+        "close": [4.0, 2.0, 3.0, 1.0],
+    })
+    profile = {**WRITER_PROFILES["stock_data_intraday"], "row_group_bytes": 20}
+
+    parquet_file = pq.ParquetFile(pa.BufferReader(encode_parquet_table(table, profile)))
+
+    assert parquet_file.read()["close"].to_pylist() == [1.0, 2.0, 3.0, 4.0]
+    metadata = parquet_file.metadata
+    assert metadata.num_row_groups > 1
+    column = metadata.row_group(0).column(0)
+    assert column.compression == "ZSTD"
+    assert column.has_offset_index
+    assert [c.column_index for c in metadata.row_group(0).sorting_columns] == [0, 1]
+
+
+def test_unknown_profile_setting_is_rejected():
+    with pytest.raises(ValueError):
+        make_profile(codec="zstd")
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pytest
+
+import rollupIntradayData
+from rollupIntradayData import add_moving_averages, compute_daily_bars, update_daily_rollup
+
+BAR_SCHEMA = pa.schema([
+    ("datetime", pa.timestamp("s")),
+    ("ticker", pa.string()),
+    ("open", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("volume", pa.float64()),
+])
+
+
+def synthetic_bars(tickers=("AMZN", "IBM", "MSFT"), days=30, seed=3):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for ticker in tickers:
+        for day in range(days):
+            start = datetime(2022, 9, 1, 9, 30) + timedelta(days=day)
+            for bar in range(rng.integers(1, 27)):
+                close = rng.uniform(90, 110)
+                spread = rng.uniform(0, 2)
+                rows.append({
+                    "datetime": start + timedelta(minutes=15 * bar),
+                    "ticker": ticker,
+                    "open": close + rng.uniform(-spread, spread),
+                    "high": close + spread,
+                    "low": close - spread,
+                    "close": close,
+                    "volume": float(rng.integers(0, 3) * rng.integers(1, 1000)),
+                })
+    # The API returns bars newest first, so shuffle to make sure order is not assumed
+    rng.shuffle(rows)
+    return pa.Table.from_pylist(rows, schema=BAR_SCHEMA)
+
+
+def naive_rollup(bars: pa.Table, nan_close_row: int = None) -> pd.DataFrame:
+    df = bars.to_pandas().sort_values(["ticker", "datetime"])
+    df["date"] = df["datetime"].dt.date
+    df["price_volume"] = (df["high"] + df["low"] + df["close"]) / 3 * df["volume"]
+    daily = df.groupby(["ticker", "date"]).agg(
+        open=("open", "first"),
+        high=("high", "max"),
+        low=("low", "min"),
+        close=("close", "last"),
+        volume=("volume", "sum"),
+        price_volume=("price_volume", "sum"),
+        bar_count=("close", "size"),
+    ).reset_index()
+    daily["vwap"] = (daily["price_volume"] / daily["volume"]).where(daily["volume"] > 0)
+    if nan_close_row is not None:
+        daily.loc[nan_close_row, "close"] = np.nan
+    for window in rollupIntradayData.MOVING_AVERAGE_WINDOWS:
+        daily[f"sma_{window}"] = daily.groupby("ticker")["close"].transform(
+            lambda close: close.rolling(window).mean()
+        )
+    return daily[rollupIntradayData.FILE_SCHEMA.names]
+
+
+@pytest.mark.parametrize("nan_close_row", [None, 0, 33])
+def test_rollup_matches_pandas_groupby(nan_close_row):
+    bars = synthetic_bars()
+    daily = compute_daily_bars(bars)
+    if nan_close_row is not None:
+        close = daily["close"].to_numpy().copy()
+        close[nan_close_row] = np.nan
+        daily = daily.set_column(daily.schema.get_field_index("close"), "close", pa.array(close))
+
+    rollup = add_moving_averages(daily).to_pandas()
+
+    expected = naive_rollup(bars, nan_close_row)
+    pd.testing.assert_frame_equal(rollup, expected, check_dtype=False)
+    if nan_close_row is not None:
+        # The average recovers once the missing close leaves the window
+        assert not np.isnan(rollup.loc[nan_close_row + 5, "sma_5"])
+
+
+def test_update_only_recomputes_affected_days(monkeypatch):
+    store = {}
+    monkeypatch.setattr(rollupIntradayData, "read_parquet_table_from_s3", store.get)
+    manifest = {}
+
+    def write(table, uri, profile):
+        store[uri] = table
+        return {"size": table.nbytes, "etag": '"etag"'}
+
+    monkeypatch.setattr(rollupIntradayData, "write_parquet_table_to_s3", write)
+    monkeypatch.setattr(rollupIntradayData, "append_entries",
+                        lambda dataset_uri, entries: manifest.update((e["key"], e) for e in entries))
+    monkeypatch.setattr(rollupIntradayData, "load_manifest",
+                        lambda dataset_uri: {"version": 1, "files": dict(manifest)})
+    monkeypatch.setattr(rollupIntradayData, "head_s3_file",
+                        lambda uri: {"size": store[uri].nbytes, "etag": '"etag"'})
+    bars = synthetic_bars(tickers=("IBM",))
+    dates = pc.cast(bars["datetime"], pa.date32())
+    first_half = bars.filter(pc.less(dates, pa.scalar(datetime(2022, 9, 16).date())))
+    second_half = bars.filter(pc.greater_equal(dates, pa.scalar(datetime(2022, 9, 16).date())))
+
+    assert len(update_daily_rollup("IBM", first_half)) == 15
+    assert len(update_daily_rollup("IBM", second_half)) == 15
+    # Reprocessing a day without changes does not rewrite the rollup
+    assert update_daily_rollup("IBM", second_half) == []
+    # An unchanged rollup missing from the manifest is recorded again
+    manifest.clear()
+    assert update_daily_rollup("IBM", second_half) == []
+
+    (stored,) = store.values()
+    pd.testing.assert_frame_equal(stored.to_pandas(), naive_rollup(bars), check_dtype=False)
+    assert manifest["IBM.parquet"]["stats"]["date"] == ["2022-09-01", "2022-09-30"]
@@ -0,0 +1,94 @@
+import gzip
+import io
+import json
+
+import pyarrow as pa
+import pytest
+from botocore.exceptions import ClientError
+
+import helperFunctions
+import s3Cache
+
+
+class FakeS3Object:
+    """Minimal stand-in for boto3's s3.Object supporting conditional GETs."""
+
+    def __init__(self, data: bytes, etag: str):
+        self.data = data
+        self.etag = etag
+        self.requests = []
+
+    def get(self, **kwargs):
+        self.requests.append(kwargs)
+        if kwargs.get("IfNoneMatch") == self.etag:
+            raise ClientError(
+                {"Error": {"Code": "304", "Message": "Not Modified"},
+                 "ResponseMetadata": {"HTTPStatusCode": 304}},
+                "GetObject",
+            )
+        return {"Body": io.BytesIO(self.data), "ETag": self.etag}
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(s3Cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(s3Cache, "CACHE_STATS", dict.fromkeys(s3Cache.CACHE_STATS, 0))
+    return tmp_path
+
+
+def test_hit_is_revalidated_with_etag(cache_dir):
+    s3_obj = FakeS3Object(b"payload", '"v1"')
+    for _ in range(3):
+        with s3Cache.open_cached(s3_obj, "bucket", "data/file.bin") as cached:
+            assert cached.read() == b"payload"
+
+    assert s3_obj.requests == [{}, {"IfNoneMatch": '"v1"'}, {"IfNoneMatch": '"v1"'}]
+    stats = s3Cache.get_cache_stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["hit_rate"] == pytest.approx(2 / 3, abs=1e-4)
+
+
+def test_changed_object_is_downloaded_again(cache_dir):
+    s3_obj = FakeS3Object(b"old", '"v1"')
+    with s3Cache.open_cached(s3_obj, "bucket", "key") as cached:
+        assert cached.read() == b"old"
+
+    s3_obj.data, s3_obj.etag = b"new", '"v2"'
+    with s3Cache.open_cached(s3_obj, "bucket", "key") as cached:
+        assert cached.read() == b"new"
+    assert s3Cache.get_cache_stats()["misses"] == 2
+
+
+def test_gzip_json_through_cache(cache_dir):
+    payload = {"EUR": {"GBP": {"2010-01-01": {"open": 0.88}}}}
+    s3_obj = FakeS3Object(gzip.compress(json.dumps(payload).encode()), '"v1"')
+    with s3Cache.open_cached(s3_obj, "bucket", "key") as cached:
+        with gzip.GzipFile(fileobj=cached) as gzip_file:
+            assert json.load(gzip_file) == payload
+
+
+def test_least_recently_used_entries_are_evicted(cache_dir, monkeypatch):
+    monkeypatch.setattr(s3Cache, "CACHE_MAX_BYTES", 10)
+    first = FakeS3Object(b"a" * 6, '"a"')
+    second = FakeS3Object(b"b" * 6, '"b"')
+    with s3Cache.open_cached(first, "bucket", "first"):
+        pass
+    with s3Cache.open_cached(second, "bucket", "second"):
+        pass
+
+    assert s3Cache.get_cache_stats()["evictions"] == 1
+    assert len(list(cache_dir.glob("*.bin"))) == 1
+    assert not list(cache_dir.glob("*.tmp"))
+
+
+def test_parquet_read_from_memory_map(cache_dir, monkeypatch):
+    table = pa.table({"ticker": ["IBM", "MSFT"], "close": [1.5, 2.5]})
+    s3_obj = FakeS3Object(helperFunctions.encode_parquet_table(table), '"v1"')
+    monkeypatch.setattr(helperFunctions, "get_s3_object", lambda bucket, key: s3_obj)
+
+    for _ in range(2):
+        assert helperFunctions.read_parquet_table_from_s3("s3://bucket/datalake/IBM.parquet").equals(table)
+
+    stats = s3Cache.get_cache_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["bytes_served"] == 2 * len(s3_obj.data)
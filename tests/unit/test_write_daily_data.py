@@ -0,0 +1,104 @@
+import os
+from datetime import date
+
+import pandas as pd
+import pytest
+
+os.environ.setdefault("API_KEY", "test")
+import getIntradayStockData
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """In-memory stand-in for the S3 partitions and manifest."""
+    store = {"files": {}, "etags": {}, "manifest": {}}
+
+    def write(table, uri, profile=None):
+        store["files"][uri] = table
+        store["etags"][uri] = f'"{len(store["files"])}"'
+        return {"size": table.nbytes, "etag": store["etags"][uri]}
+
+    monkeypatch.setattr(getIntradayStockData, "read_parquet_table_from_s3", store["files"].get)
+    monkeypatch.setattr(getIntradayStockData, "write_parquet_table_to_s3", write)
+    monkeypatch.setattr(getIntradayStockData, "append_entries",
+                        lambda dataset_uri, entries: store["manifest"].update((e["key"], e) for e in entries))
+    monkeypatch.setattr(getIntradayStockData, "load_manifest",
+                        lambda dataset_uri: {"version": 1, "files": dict(store["manifest"])})
+    monkeypatch.setattr(getIntradayStockData, "head_s3_file",
+                        lambda uri: {"size": store["files"][uri].nbytes, "etag": store["etags"][uri]})
+    return store
+
+
+def bars(*times, close=1.5):
+    return pd.DataFrame({
+        "datetime": pd.to_datetime(list(times)),
+        "ticker": "IBM",
+        "open": 1.0,
+        "high": 2.0,
+        "low": 0.5,
+        "close": close,
+        "volume": 100.0,
+    })
+
+
+def test_unchanged_partition_is_skipped(store):
+    df = bars("2022-10-03 09:30", "2022-10-03 09:45")
+    assert getIntradayStockData.write_daily_data(df, [date(2022, 10, 3)])["written"] == ["2022-10-03"]
+
+    report = getIntradayStockData.write_daily_data(df, [date(2022, 10, 3)])
+
+    assert report["written"] == []
+    assert report["skipped"] == ["2022-10-03"]
+    # Unchanged partitions still feed the rollup
+    assert [table.num_rows for table in report["tables"]] == [2]
+    assert list(store["files"]) == [f"{getIntradayStockData.LOCATION}date=2022-10-03/IBM.parquet"]
+
+
+def test_unchanged_partition_is_added_to_manifest(store):
+    df = bars("2022-10-03 09:30", "2022-10-03 09:45")
+    getIntradayStockData.write_daily_data(df, [date(2022, 10, 3)])
+    key = "date=2022-10-03/IBM.parquet"
+
+    # The manifest update of a previous run was lost
+    del store["manifest"][key]
+    assert getIntradayStockData.write_daily_data(df, [date(2022, 10, 3)])["written"] == []
+    assert store["manifest"][key]["etag"] == '"1"'
+    assert store["manifest"][key]["row_count"] == 2
+
+    # The file was replaced outside of this writer
+    store["etags"][f"{getIntradayStockData.LOCATION}{key}"] = '"2"'
+    getIntradayStockData.write_daily_data(df, [date(2022, 10, 3)])
+    assert store["manifest"][key]["etag"] == '"2"'
+
+
+def test_day_without_bars_is_not_written(store):
+    df = bars("2022-10-07 15:45")
+
+    report = getIntradayStockData.write_daily_data(df, [date(2022, 10, 8)])
+
+    assert report["written"] == []
+    assert report["skipped"] == ["2022-10-08"]
+    assert report["tables"] == []
+    assert store["files"] == {}
+    assert store["manifest"] == {}
+
+
+def test_rollup_catches_up_after_failed_run(store, monkeypatch):
+    monkeypatch.setattr(getIntradayStockData, "get_stock_data", lambda ticker: bars("2022-10-03 09:30"))
+    rolled_up = []
+
+    def failing_rollup(ticker, table):
+        raise TimeoutError()
+
+    monkeypatch.setattr(getIntradayStockData, "update_daily_rollup", failing_rollup)
+    event = {"ticker": "IBM", "dates": ["2022-10-03"]}
+    with pytest.raises(TimeoutError):
+        getIntradayStockData.lambda_handler(event, None)
+
+    monkeypatch.setattr(getIntradayStockData, "update_daily_rollup",
+                        lambda ticker, table: rolled_up.append(table.num_rows) or ["2022-10-03"])
+    response = getIntradayStockData.lambda_handler(event, None)
+
+    assert response["partitionsSkipped"] == ["2022-10-03"]
+    assert response["rollupDaysUpdated"] == ["2022-10-03"]
+    assert rolled_up == [1]